@@ -1,21 +1,27 @@
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor
+import functools
 import getpass
 import json
 import logging
+import os
+import queue
 import socket
 import sys
 import argparse
-from netboxapi import NetboxAPI
 from tqdm import tqdm
 
 from . import __appname__, __version__
+from netbox_netprod_importer.api import get_netbox_api, get_pool_stats
+from netbox_netprod_importer.cache import NetboxLookupCache, ParserCache
 from netbox_netprod_importer.config import get_config, load_config
-from netbox_netprod_importer.devices_list import parse_devices_yaml_def
-from netbox_netprod_importer.devices_list import parse_filter_yaml_def
+from netbox_netprod_importer.devices_list import iter_devices_yaml_def
+from netbox_netprod_importer.devices_list import iter_filter_yaml_def
 from netbox_netprod_importer.push import (
     NetboxDevicePropsPusher, NetboxInterconnectionsPusher
 )
+from netbox_netprod_importer.results import DEFAULT_PATH, PollResultsStore
+from netbox_netprod_importer.snapshot import iter_snapshots, save_snapshot
 
 
 logger = logging.getLogger("netbox_importer")
@@ -43,10 +49,65 @@ def parse_args():
     )
     sp_inventory.set_defaults(func=inventory)
 
-    for sp in (sp_import, sp_interconnect, sp_inventory):
+    sp_poll = subcommands.add_parser(
+        "poll", help=("poll devices and save their data, without pushing it")
+    )
+    sp_poll.set_defaults(func=poll)
+    sp_poll.add_argument(
+        "--save", metavar="DIR",
+        help="directory where to save the polled data of each device",
+        dest="save_dir", type=str, required=True
+    )
+
+    sp_push = subcommands.add_parser(
+        "push",
+        help=("push data saved by poll (import + interconnect), without "
+              "connecting to the devices")
+    )
+    sp_push.set_defaults(func=push)
+    sp_push.add_argument(
+        "--from", metavar="DIR",
+        help="directory containing the data saved by poll",
+        dest="from_dir", type=str, required=True
+    )
+
+    for sp in (sp_import, sp_inventory, sp_push):
+        sp.add_argument(
+            "--push-threads", metavar="PUSH_THREADS",
+            help=("push to netbox from a separate pool of PUSH_THREADS "
+                  "threads, THREADS being the number of polling threads"),
+            dest="push_threads", type=int
+        )
+        sp.add_argument(
+            "--preload-vlans",
+            help=("fetch all vlans of a device site in one listing instead "
+                  "of one query per vlan"),
+            dest="preload_vlans", action="store_true"
+        )
+        sp.add_argument(
+            "--skip-unchanged",
+            help=("do not push devices and interfaces unchanged since their "
+                  "last push, stored locally"),
+            dest="skip_unchanged", action="store_true"
+        )
+        sp.add_argument(
+            "--force",
+            help=("with --skip-unchanged, push all polled data and refresh "
+                  "the stored results"),
+            dest="force", action="store_true"
+        )
+        sp.add_argument(
+            "--queue-size", metavar="SIZE",
+            help=("maximum number of polled devices waiting to be pushed, "
+                  "with --push-threads (default: twice PUSH_THREADS)"),
+            dest="queue_size", type=int
+        )
+
+    for sp in (sp_import, sp_interconnect, sp_inventory, sp_poll):
         sp.add_argument(
             "-f", "--file", metavar="DEVICES",
-            help="Yaml file containing a definition of devices to poll",
+            help=("Yaml file containing a definition of devices to poll "
+                  "(or .jsonl/.csv file with the same schema)"),
             dest="devices", type=str
         )
         sp.add_argument(
@@ -69,20 +130,37 @@ def parse_args():
             help="credentials for connections to the devices",
             dest="password", type=str
         )
+
+    for sp in (sp_import, sp_interconnect, sp_inventory, sp_poll, sp_push):
         sp.add_argument(
             "-t", "--threads", metavar="THREADS",
             help="number of threads to run",
             dest="threads", default=10, type=int
         )
+        sp.add_argument(
+            "-v", "--verbose", metavar="LEVEL",
+            help="enable debug or warning, verbose output",
+            dest="verbose"
+        )
+
+    for sp in (sp_import, sp_interconnect, sp_inventory, sp_push):
         sp.add_argument(
             "--overwrite",
             help="overwrite data already pushed",
             dest="overwrite", action="store_true"
         )
         sp.add_argument(
-            "-v", "--verbose", metavar="LEVEL",
-            help="enable debug or warning, verbose output",
-            dest="verbose"
+            "--bulk",
+            help="push interfaces through the netbox bulk endpoints",
+            dest="bulk", action="store_true"
+        )
+
+    for sp in (sp_interconnect, sp_inventory, sp_push):
+        sp.add_argument(
+            "--two-phase",
+            help=("find the neighbours of all devices first, then reconcile "
+                  "all cables through the netbox bulk endpoints"),
+            dest="two_phase", action="store_true"
         )
 
     parser.add_argument(
@@ -105,15 +183,19 @@ def parse_args():
                 raise ValueError('Invalid log level: %s' % args.verbose)
             logging.getLogger().setLevel(numeric_level)
 
-        args.creds = _get_creds(args)
         print("Initializing importers...")
-        if args.devices:
-            args.importers = parse_devices_yaml_def(
-                args.devices, args.creds
+        args.parser_cache = None
+        if getattr(args, "from_dir", None):
+            args.importers = iter_snapshots(args.from_dir)
+        elif args.devices:
+            args.parser_cache = _get_parser_cache()
+            args.importers = iter_devices_yaml_def(
+                args.devices, _get_creds(args), args.parser_cache
             )
         elif args.filter:
-            args.importers = parse_filter_yaml_def(
-                args.filter, args.creds
+            args.parser_cache = _get_parser_cache()
+            args.importers = iter_filter_yaml_def(
+                args.filter, _get_creds(args), args.parser_cache
             )
         else:
             arg_parser.error("Device file or filter file required")
@@ -124,18 +206,161 @@ def parse_args():
         sys.exit(1)
 
 def inventory(parsed_args):
-    import_data(parsed_args)
-    interconnect(parsed_args)
+    lookup_cache = _get_lookup_cache()
+    interco_pusher = _get_interconnections_pusher(lookup_cache=lookup_cache)
+
+    importers = {}
+    neighbours = {}
+    for host, props in _devices_polling(
+            parsed_args, polled_importers=importers, with_neighbours=True,
+            interfaces_cache=interco_pusher.interfaces_cache,
+            lookup_cache=lookup_cache
+    ):
+        neighbours[host] = props.get("neighbours")
+
+    _push_interconnections(parsed_args, interco_pusher, importers, neighbours)
+    _print_lookup_cache_stats(lookup_cache)
+    _print_parser_cache_stats(parsed_args.parser_cache)
+    _print_netbox_pool_stats()
+
+
+def push(parsed_args):
+    """
+    Replay the data saved by poll, as an inventory
+    """
+    inventory(parsed_args)
+
+
+def poll(parsed_args):
+    os.makedirs(parsed_args.save_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=parsed_args.threads) as executor:
+        futures = {}
+        for host, importer in _iter_importers(parsed_args.importers):
+            future = executor.submit(
+                _poll_and_save, parsed_args.save_dir, host, importer
+            )
+            futures[future] = host
+
+        for future in tqdm(
+                concurrent.futures.as_completed(futures), total=len(futures)
+        ):
+            host = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Error when polling device %s: %s", host, e)
+
+    _print_parser_cache_stats(parsed_args.parser_cache)
+
+
+def _poll_and_save(save_dir, host, importer):
+    with importer:
+        props = _poll(importer, with_neighbours=True)
+    save_snapshot(save_dir, host, importer, props)
+
 
 def import_data(parsed_args):
-    print("Fetching and pushing data...")
-    for host, props in _multithreaded_devices_polling(
-            importers=parsed_args.importers,
-            threads=parsed_args.threads,
-            overwrite=parsed_args.overwrite
+    lookup_cache = _get_lookup_cache()
+    for host, props in _devices_polling(
+            parsed_args, lookup_cache=lookup_cache
     ):
         continue
 
+    _print_lookup_cache_stats(lookup_cache)
+    _print_parser_cache_stats(parsed_args.parser_cache)
+    _print_netbox_pool_stats()
+
+
+def _get_lookup_cache():
+    return NetboxLookupCache(get_config().get("lookup_cache"))
+
+
+def _print_lookup_cache_stats(lookup_cache):
+    for kind, stats in sorted(lookup_cache.stats.items()):
+        print("Netbox {} lookups: {} hit(s), {} miss(es)".format(
+            kind, stats["hits"], stats["misses"]
+        ))
+
+
+def _get_parser_cache():
+    return ParserCache(get_config().get("parser_cache"))
+
+
+def _print_parser_cache_stats(parser_cache):
+    if parser_cache is None:
+        return
+
+    for family, stats in sorted(parser_cache.stats.items()):
+        if stats["hits"] or stats["misses"]:
+            print(
+                "Parser {} cache: {} hit(s), {} miss(es), {} eviction(s)"
+                .format(
+                    family, stats["hits"], stats["misses"],
+                    stats["evictions"]
+                )
+            )
+
+
+def _print_netbox_pool_stats():
+    for stats in get_pool_stats(get_netbox_api()):
+        print(
+            "Netbox connections to {}: {} request(s) over {} connection(s), "
+            "{}/{} kept alive".format(
+                stats["host"], stats["requests"], stats["connections"],
+                stats["idle"], stats["maxsize"]
+            )
+        )
+
+
+def _devices_polling(parsed_args, polled_importers=None, **kwargs):
+    """
+    :param polled_importers: dict filled with each {hostname: importer}
+                             handed to the polling engine
+    """
+    print("Fetching and pushing data...")
+    if parsed_args.push_threads:
+        devices_polling = functools.partial(
+            _pipelined_devices_polling,
+            push_threads=parsed_args.push_threads,
+            queue_size=parsed_args.queue_size
+        )
+    else:
+        devices_polling = _multithreaded_devices_polling
+
+    yield from devices_polling(
+        importers=_iter_importers(parsed_args.importers, polled_importers),
+        threads=parsed_args.threads,
+        overwrite=parsed_args.overwrite,
+        bulk=parsed_args.bulk,
+        preload_vlans=parsed_args.preload_vlans,
+        results_store=(
+            _get_results_store() if parsed_args.skip_unchanged else None
+        ),
+        force=parsed_args.force,
+        **kwargs
+    )
+
+
+def _get_results_store():
+    results_config = get_config().get("poll_results") or {}
+    return PollResultsStore(results_config.get("path") or DEFAULT_PATH)
+
+
+def _iter_importers(importers, seen=None):
+    """
+    :param importers: {hostname: importer}, or iterable of (hostname,
+                      importer) when streamed from netbox
+    :param seen: dict to fill with the iterated importers
+    """
+    if hasattr(importers, "items"):
+        importers = importers.items()
+
+    for host, importer in importers:
+        if seen is not None:
+            seen[host] = importer
+        yield host, importer
+
 
 def _get_creds(parsed_args):
     creds = ()
@@ -147,14 +372,15 @@ def _get_creds(parsed_args):
     return creds
 
 
-def _multithreaded_devices_polling(importers, threads=10, overwrite=False):
-    importers = importers.copy()
-    netbox_api = NetboxAPI(**get_config()["netbox"])
+def _multithreaded_devices_polling(importers, threads=10,
+                                   with_neighbours=False, **pusher_kwargs):
+    netbox_api = get_netbox_api()
     with ThreadPoolExecutor(max_workers=threads) as executor:
         futures = {}
-        for host, importer in importers.items():
+        for host, importer in _iter_importers(importers):
             future = executor.submit(
-                _poll_and_push, netbox_api, host, importer, overwrite
+                _poll_and_push, netbox_api, host, importer, with_neighbours,
+                **pusher_kwargs
             )
 
             futures[future] = host
@@ -167,37 +393,156 @@ def _multithreaded_devices_polling(importers, threads=10, overwrite=False):
             host = futures[future]
             try:
                 yield host, future.result()
-                importers.pop(host)
             except Exception as e:
                 logger.error("Error when polling device %s: %s", host, e)
 
 
-def _poll_and_push(netbox_api, host, importer, overwrite):
+def _poll_and_push(netbox_api, host, importer, with_neighbours=False,
+                   **pusher_kwargs):
     with importer:
-        props = importer.poll()
+        props = _poll(importer, with_neighbours)
         pusher = NetboxDevicePropsPusher(
-            netbox_api, host, props, overwrite=overwrite
+            netbox_api, host, props, **pusher_kwargs
         )
         pusher.push()
 
         return props
 
 
+def _poll(importer, with_neighbours=False):
+    """
+    Poll an opened importer
+
+    :param with_neighbours: also fetch the device neighbours during the same
+        session, in props["neighbours"] (None if they cannot be fetched)
+    """
+    importer.prefetch(with_neighbours)
+    props = importer.poll()
+    if with_neighbours:
+        try:
+            props["neighbours"] = list(importer.get_neighbours())
+        except Exception as e:
+            logger.debug(
+                "Error getting neighbours on host %s: %s", importer.hostname, e
+            )
+            props["neighbours"] = None
+
+    return props
+
+
+def _pipelined_devices_polling(importers, threads=10, push_threads=10,
+                               queue_size=None, with_neighbours=False,
+                               **pusher_kwargs):
+    """
+    Poll and push devices from two separate pools of threads
+
+    Polling threads put the polled properties of each device in a bounded
+    queue, consumed by the pushing threads. When the queue is full, polling
+    threads wait for the push to catch up.
+    """
+    netbox_api = get_netbox_api()
+    props_queue = queue.Queue(maxsize=queue_size or push_threads * 2)
+    results_queue = queue.Queue()
+
+    with ThreadPoolExecutor(max_workers=push_threads) as push_executor:
+        for _ in range(push_threads):
+            push_executor.submit(
+                _push_from_queue, netbox_api, props_queue, results_queue,
+                **pusher_kwargs
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as poll_executor:
+                nb_importers = 0
+                for host, importer in _iter_importers(importers):
+                    poll_executor.submit(
+                        _poll_to_queue, host, importer, props_queue,
+                        results_queue, with_neighbours
+                    )
+                    nb_importers += 1
+
+                for _ in tqdm(range(nb_importers)):
+                    host, props, error = results_queue.get()
+                    if error:
+                        logger.error(
+                            "Error when polling device %s: %s", host, error
+                        )
+                    else:
+                        yield host, props
+        finally:
+            for _ in range(push_threads):
+                props_queue.put(None)
+
+
+def _poll_to_queue(host, importer, props_queue, results_queue,
+                   with_neighbours=False):
+    try:
+        with importer:
+            props = _poll(importer, with_neighbours)
+    except Exception as e:
+        results_queue.put((host, None, e))
+    else:
+        props_queue.put((host, props))
+
+
+def _push_from_queue(netbox_api, props_queue, results_queue, **pusher_kwargs):
+    for host, props in iter(props_queue.get, None):
+        try:
+            pusher = NetboxDevicePropsPusher(
+                netbox_api, host, props, **pusher_kwargs
+            )
+            pusher.push()
+        except Exception as e:
+            results_queue.put((host, None, e))
+        else:
+            results_queue.put((host, props, None))
+
+
 def interconnect(parsed_args):
-    netbox_api = NetboxAPI(**get_config()["netbox"])
+    lookup_cache = _get_lookup_cache()
+    _push_interconnections(
+        parsed_args, _get_interconnections_pusher(lookup_cache=lookup_cache),
+        dict(_iter_importers(parsed_args.importers))
+    )
+    _print_lookup_cache_stats(lookup_cache)
+    _print_parser_cache_stats(parsed_args.parser_cache)
+    _print_netbox_pool_stats()
+
+
+def _get_interconnections_pusher(**kwargs):
+    netbox_api = get_netbox_api()
     remove_domains = get_config().get("remove_domains")
+    interfaces_cache_size = get_config().get("interfaces_cache_size")
+    if interfaces_cache_size:
+        kwargs["interfaces_cache_size"] = interfaces_cache_size
 
-    interco_pusher = NetboxInterconnectionsPusher(
-        netbox_api, remove_domains=remove_domains
+    return NetboxInterconnectionsPusher(
+        netbox_api, remove_domains=remove_domains, **kwargs
     )
 
-    print("Finding neighbours and interconnecting...")
+
+def _push_interconnections(parsed_args, interco_pusher, importers,
+                           neighbours=None):
+    try:
+        interco_pusher.prewarm_interfaces_cache(importers.keys())
+    except Exception as e:
+        logger.warning("Could not pre-warm the interfaces cache: %s", e)
+
+    if neighbours is None:
+        print("Finding neighbours and interconnecting...")
+    else:
+        print("Interconnecting...")
     interco_result = interco_pusher.push(
-        importers=parsed_args.importers,
+        importers=importers,
         threads=parsed_args.threads,
-        overwrite=parsed_args.overwrite
+        overwrite=parsed_args.overwrite,
+        neighbours=neighbours,
+        two_phase=parsed_args.two_phase
     )
     print("{} interconnection(s) applied".format(interco_result["done"]))
+    print("{} cable(s) written, {} unchanged".format(
+        interco_pusher.stats["written"], interco_pusher.stats["skipped"]
+    ))
     if interco_result["errors_device"]:
         logger.error(
             "Error getting neighbours on %s device(s)",
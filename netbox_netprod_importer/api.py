@@ -0,0 +1,166 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import logging
+import threading
+
+from netboxapi import NetboxAPI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from netbox_netprod_importer.config import get_config
+
+
+logger = logging.getLogger("netbox_importer")
+
+#: {option: default value} of the HTTP session options read from the netbox
+#: config section, not passed to the netbox client
+default_session_settings = {
+    # maximum number of connections kept alive to netbox, should be higher
+    # than the number of threads pushing concurrently
+    "pool_size": 64,
+    # number of retries on connection errors, rate limiting or server errors
+    "retries": 3,
+    # sleep between retries: backoff_factor * 2^(retry - 1) seconds
+    "backoff_factor": 0.5,
+    # ask netbox to compress its responses
+    "gzip": True,
+}
+
+#: HTTP statuses retried with a backoff: rate limiting and server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+#: POST is never retried, as it could create an object twice
+RETRY_METHODS = frozenset(("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "PUT"))
+
+_netbox_api_lock = threading.Lock()
+
+
+def get_netbox_api():
+    """
+    Get the netbox client shared by every pusher of the run
+
+    The client is built once from the netbox config section, its session
+    being tuned with the session options of this section.
+
+    :return netbox_api: NetboxAPI
+    """
+    with _netbox_api_lock:
+        if getattr(get_netbox_api, "cache", None) is None:
+            get_netbox_api.cache = build_netbox_api(get_config()["netbox"])
+
+    return get_netbox_api.cache
+
+
+def build_netbox_api(netbox_config):
+    """
+    :param netbox_config: netbox config section, containing the NetboxAPI
+                          parameters and the session options
+    :return netbox_api: NetboxAPI with a tuned session
+    """
+    netbox_config = dict(netbox_config)
+    session_settings = dict(default_session_settings)
+    for option in default_session_settings:
+        if option in netbox_config:
+            session_settings[option] = netbox_config.pop(option)
+
+    netbox_api = NetboxAPI(**netbox_config)
+    _tune_session(netbox_api.session, **session_settings)
+
+    return netbox_api
+
+
+def _tune_session(session, pool_size, retries, backoff_factor, gzip):
+    retry_kwargs = dict(
+        total=retries, backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES, raise_on_status=False
+    )
+    try:
+        max_retries = Retry(allowed_methods=RETRY_METHODS, **retry_kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        max_retries = Retry(method_whitelist=RETRY_METHODS, **retry_kwargs)
+
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    session.headers["Connection"] = "keep-alive"
+    if gzip:
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+    else:
+        session.headers["Accept-Encoding"] = "identity"
+
+
+def get_pool_stats(netbox_api):
+    """
+    Get the usage of the connection pools of the netbox client session
+
+    :return stats: list of {"host", "maxsize", "connections", "requests",
+                   "idle"} per pool, connections being the number of
+                   connections opened, idle the number of connections
+                   currently kept alive in the pool
+    """
+    stats = []
+    seen_pool_managers = set()
+    for adapter in netbox_api.session.adapters.values():
+        pool_manager = getattr(adapter, "poolmanager", None)
+        if pool_manager is None or id(pool_manager) in seen_pool_managers:
+            continue
+        seen_pool_managers.add(id(pool_manager))
+
+        for key in pool_manager.pools.keys():
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+
+            stats.append({
+                "host": pool.host,
+                "maxsize": pool.pool.maxsize if pool.pool else 0,
+                "connections": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool else 0,
+            })
+
+    return stats
+
+
+def iter_netbox_objects(netbox_api, route, params=None, page_size=500,
+                        prefetch=4):
+    """
+    Iterate over all objects of a netbox listing
+
+    The first page gives the total count, next pages are then fetched by
+    offset windows from a pool of threads, at most `prefetch` pages ahead of
+    the consumer.
+
+    :param page_size: number of objects asked per page, netbox can return
+                      less if capped by its MAX_PAGE_SIZE
+    """
+    params = dict(params or {})
+    params["limit"] = page_size
+
+    def get_page(offset):
+        return netbox_api.get(route, params=dict(params, offset=offset))
+
+    first_page = get_page(0)
+    yield from first_page["results"]
+
+    step = len(first_page["results"])
+    if not step or not first_page.get("next"):
+        return
+
+    offsets = iter(range(step, first_page["count"], step))
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        pages = deque(
+            executor.submit(get_page, offset)
+            for offset in itertools.islice(offsets, prefetch)
+        )
+        while pages:
+            page = pages.popleft().result()
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pages.append(executor.submit(get_page, next_offset))
+
+            yield from page["results"]
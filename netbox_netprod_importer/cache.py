@@ -0,0 +1,206 @@
+from collections import Counter
+import threading
+
+import cachetools
+
+
+class _CountingTTLCache(cachetools.TTLCache):
+    """
+    TTLCache counting the entries evicted, because full or expired
+    """
+
+    def __init__(self, maxsize, ttl, stats):
+        """
+        :param stats: Counter whose "evictions" are incremented
+        """
+        super().__init__(maxsize, ttl)
+        self._stats = stats
+
+    def popitem(self):
+        item = super().popitem()
+        self._stats["evictions"] += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._stats["evictions"] += len(expired)
+        return expired
+
+
+class _TTLCacheByKind():
+    """
+    Thread-safe cache split by kind, each kind having its own size, TTL and
+    lock. Hits, misses and evictions are counted per kind.
+    """
+
+    #: {kind: {"maxsize": max number of entries, "ttl": seconds}}
+    default_settings = {}
+
+    def __init__(self, settings=None):
+        """
+        :param settings: {kind: {"maxsize": int, "ttl": int}}, overriding
+                         the default settings of each kind
+        """
+        self._caches = {}
+        self._locks = {}
+        self.stats = {}
+
+        settings = settings or {}
+        for kind, default_kind_settings in self.default_settings.items():
+            kind_settings = dict(
+                default_kind_settings, **(settings.get(kind) or {})
+            )
+            self.stats[kind] = Counter(hits=0, misses=0)
+            self._caches[kind] = _CountingTTLCache(
+                kind_settings["maxsize"], kind_settings["ttl"],
+                self.stats[kind]
+            )
+            self._locks[kind] = threading.Lock()
+
+    def get(self, kind, key):
+        """
+        :return value: cached value, None if missing
+        """
+        with self._locks[kind]:
+            try:
+                value = self._caches[kind][key]
+                self.stats[kind]["hits"] += 1
+                return value
+            except KeyError:
+                self.stats[kind]["misses"] += 1
+                return None
+
+    def get_or_fetch(self, kind, key, fetch):
+        """
+        Get a cached value, or fetch and cache it if missing
+
+        The fetch is done outside of the lock, so two threads missing the same
+        key at the same time will both fetch it. None is never cached.
+
+        :param fetch: callable, returning the value to cache
+        """
+        value = self.get(kind, key)
+        if value is not None:
+            return value
+
+        value = fetch()
+        if value is not None:
+            self.set(kind, key, value)
+
+        return value
+
+    def get_many(self, kind, keys):
+        """
+        :return values: {key: value} of the cached keys, missing keys being
+                        ignored
+        """
+        values = {}
+        with self._locks[kind]:
+            for key in keys:
+                try:
+                    values[key] = self._caches[kind][key]
+                    self.stats[kind]["hits"] += 1
+                except KeyError:
+                    self.stats[kind]["misses"] += 1
+
+        return values
+
+    def set(self, kind, key, value):
+        with self._locks[kind]:
+            self._caches[kind][key] = value
+
+    def invalidate(self, kind, key):
+        with self._locks[kind]:
+            self._caches[kind].pop(key, None)
+
+
+class NetboxLookupCache(_TTLCacheByKind):
+    """
+    Thread-safe cache of Netbox lookups, meant to be shared by all pushers
+
+    Lookups are split by kind (choices, vlans, devices, ip), each kind having
+    its own size, TTL and lock. Hits, misses and evictions are counted per
+    kind.
+    """
+
+    default_settings = {
+        "choices": {"maxsize": 16, "ttl": 3600},
+        "vlans": {"maxsize": 65536, "ttl": 600},
+        "devices": {"maxsize": 16384, "ttl": 600},
+        "ip": {"maxsize": 65536, "ttl": 600},
+    }
+
+
+class ParserCache(_TTLCacheByKind):
+    """
+    Thread-safe cache of what vendor parsers fetch from devices, meant to be
+    shared by all importers
+
+    Entries are split by command family (raw cli outputs, interfaces, vlans,
+    config, chassis), each family having its own size, TTL and lock, and are
+    keyed by (hostname, key). The entries of a device are dropped when its
+    session is opened or released.
+    """
+
+    default_settings = {
+        "cli": {"maxsize": 1024, "ttl": 600},
+        "interfaces": {"maxsize": 8192, "ttl": 600},
+        "vlans": {"maxsize": 4096, "ttl": 600},
+        "config": {"maxsize": 1024, "ttl": 600},
+        "chassis": {"maxsize": 16384, "ttl": 3600},
+    }
+
+    def __init__(self, settings=None):
+        """
+        :param settings: {family: {"maxsize": int, "ttl": int}}, overriding
+                         the default settings of each family
+        """
+        super().__init__(settings)
+
+        #: {hostname: {(family, key)}} of the entries set for each device,
+        #: some of them may have been evicted since
+        self._devices_keys = {}
+        self._devices_lock = threading.Lock()
+
+    def for_device(self, hostname):
+        """
+        :return device_cache: DeviceParserCache of hostname
+        """
+        return DeviceParserCache(self, hostname)
+
+    def set(self, kind, key, value):
+        super().set(kind, key, value)
+        with self._devices_lock:
+            self._devices_keys.setdefault(key[0], set()).add((kind, key))
+
+    def invalidate_device(self, hostname):
+        """
+        Drop all entries of a device
+        """
+        with self._devices_lock:
+            keys = self._devices_keys.pop(hostname, ())
+
+        for kind, key in keys:
+            self.invalidate(kind, key)
+
+
+class DeviceParserCache():
+    """
+    View of a ParserCache limited to the entries of one device
+    """
+
+    def __init__(self, parser_cache, hostname):
+        self.parser_cache = parser_cache
+        self.hostname = hostname
+
+    def get(self, family, key):
+        return self.parser_cache.get(family, (self.hostname, key))
+
+    def get_or_fetch(self, family, key, fetch):
+        return self.parser_cache.get_or_fetch(
+            family, (self.hostname, key), fetch
+        )
+
+    def set(self, family, key, value):
+        self.parser_cache.set(family, (self.hostname, key), value)
@@ -1,81 +1,227 @@
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
 import logging
 import napalm
-from tqdm import tqdm
+import os
 import yaml
+from yaml.composer import Composer
 
 from netbox_netprod_importer.importer import DeviceImporter
 
-from netboxapi import NetboxAPI
-from netbox_netprod_importer.config import get_config
+from netbox_netprod_importer.api import (
+    get_netbox_api, iter_netbox_objects
+)
 
 logger = logging.getLogger("netbox_importer")
 
 
-def parse_devices_yaml_def(devices_yaml, creds=None):
-    devices = {}
-    with open(devices_yaml) as devices_yaml_str:
-        for hostname, props in tqdm(yaml.safe_load(devices_yaml_str).items()):
-            try:
-                devices[hostname] = DeviceImporter(
-                    props.get("target") or hostname,
-                    napalm_driver_name=props["driver"],
-                    napalm_optional_args=props.get("optional_args"),
-                    creds=creds,
-                    discovery_protocol=props.get("discovery_protocol")
-                )
-            except Exception as e:
-                logger.error(
-                    "Cannot connect to device %s: %s", hostname, e
-                )
-    return devices
-
-
-def parse_filter_yaml_def(filter_yaml, creds=None):
-    netbox_api = NetboxAPI(**get_config()["netbox"])
-    devices = {}
+class _YAMLMappingLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader),
+                         Composer):
+    """
+    Safe yaml loader, using libyaml when available, exposing the composer to
+    build the document nodes one by one
+    """
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        Composer.__init__(self)
+
+
+def parse_devices_yaml_def(devices_yaml, creds=None, parser_cache=None):
+    """
+    :return devices: {hostname: DeviceImporter} of all devices defined
+    """
+    return dict(iter_devices_yaml_def(devices_yaml, creds, parser_cache))
+
+
+def iter_devices_yaml_def(devices_yaml, creds=None, parser_cache=None):
+    """
+    Stream the devices of a definition file, as it is read
+
+    :param devices_yaml: yaml file, or JSON Lines (.jsonl, .ndjson) or CSV
+                         (.csv) file with the same schema
+    :param parser_cache: ParserCache shared by the importers
+    :return devices: iterator of (hostname, DeviceImporter)
+    """
+    for hostname, props in iter_devices_def(devices_yaml):
+        try:
+            yield hostname, DeviceImporter(
+                props.get("target") or hostname,
+                napalm_driver_name=props["driver"],
+                napalm_optional_args=props.get("optional_args"),
+                creds=creds,
+                discovery_protocol=props.get("discovery_protocol"),
+                parser_cache=parser_cache
+            )
+        except Exception as e:
+            logger.error(
+                "Cannot connect to device %s: %s", hostname, e
+            )
+
+
+def iter_devices_def(devices_file):
+    """
+    Read the devices definitions of a file, one device at a time
+
+    :return devices: iterator of (hostname, props)
+    """
+    extension = os.path.splitext(devices_file)[1].lower()
+    with open(devices_file, newline="") as devices_stream:
+        if extension in (".jsonl", ".ndjson"):
+            yield from _iter_devices_jsonl(devices_stream)
+        elif extension == ".csv":
+            yield from _iter_devices_csv(devices_stream)
+        else:
+            yield from _iter_yaml_mapping(devices_stream)
+
+
+def _iter_yaml_mapping(stream):
+    """
+    Iterate over the items of a top level yaml mapping, each item being
+    constructed as soon as it is parsed
+
+    Like yaml.safe_load, a stream of several documents is refused, once the
+    items of the first one are iterated.
+
+    :return items: iterator of (key, value)
+    """
+    loader = _YAMLMappingLoader(stream)
+    try:
+        loader.get_event()
+        if not loader.check_event(yaml.DocumentStartEvent):
+            return
+        document_start = loader.get_event()
+
+        if loader.check_event(yaml.ScalarEvent) and \
+                loader.peek_event().value in ("", "~", "null"):
+            loader.get_event()
+        elif not loader.check_event(yaml.MappingStartEvent):
+            raise ValueError(
+                "Devices definition is expected to be a mapping "
+                "{hostname: props}"
+            )
+        else:
+            yield from _iter_yaml_mapping_items(loader)
+
+        # end of the document
+        loader.get_event()
+        if not loader.check_event(yaml.StreamEndEvent):
+            raise yaml.composer.ComposerError(
+                "expected a single document in the stream",
+                document_start.start_mark, "but found another document",
+                loader.get_event().start_mark
+            )
+    finally:
+        loader.dispose()
+
+
+def _iter_yaml_mapping_items(loader):
+    """
+    :param loader: loader whose next event starts the mapping to iterate
+    """
+    loader.get_event()
+    while not loader.check_event(yaml.MappingEndEvent):
+        key = loader.construct_object(
+            loader.compose_node(None, None), deep=True
+        )
+        value = loader.construct_object(
+            loader.compose_node(None, None), deep=True
+        )
+        # objects are only kept to construct the current item, anchors
+        # are still resolved from the composed nodes
+        loader.constructed_objects = {}
+        loader.recursive_objects = {}
+
+        yield key, value
+    loader.get_event()
+
+
+def _iter_devices_jsonl(stream):
+    """
+    Each line is a json object: {"hostname": hostname, **props}
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        props = json.loads(line)
+        yield props.pop("hostname"), props
+
+
+def _iter_devices_csv(stream):
+    """
+    First line is the header, with a hostname column and one column by
+    property. Empty cells are ignored, optional_args is a json object.
+    """
+    for row in csv.DictReader(stream):
+        props = {k: v for k, v in row.items() if k and v}
+        if "optional_args" in props:
+            props["optional_args"] = json.loads(props["optional_args"])
+
+        yield props.pop("hostname"), props
+
+
+def parse_filter_yaml_def(filter_yaml, creds=None, parser_cache=None):
+    """
+    :return devices: {hostname: DeviceImporter} of all devices matching the
+                     filter
+    """
+    return dict(iter_filter_yaml_def(filter_yaml, creds, parser_cache))
+
+
+def iter_filter_yaml_def(filter_yaml, creds=None, parser_cache=None):
+    """
+    Stream the devices matching a filter, as their pages are listed
+
+    :param parser_cache: ParserCache shared by the importers
+    :return devices: iterator of (hostname, DeviceImporter)
+    """
+    netbox_api = get_netbox_api()
     with open(filter_yaml) as filter_yaml_str:
         yml = yaml.safe_load(filter_yaml_str)
-        platforms_js = netbox_api.get("dcim/platforms")
-        platforms = {}
-        for platform in platforms_js["results"]:
-            if platform["napalm_driver"]:
-                if platform["napalm_driver"]:
-                    platforms[platform["id"]] = {
-                        "napalm_driver": platform["napalm_driver"],
-                        "napalm_args": platform["napalm_args"]
-                    }
-        if not platforms:
-            raise Exception("Not for one platform napalm_driver is not "
-                            "defined")
-
-        devlist = netbox_api.get("dcim/devices/", params=yml["filter"])
-        for device in devlist["results"]:
-            if not device.get("platform") or \
-                    not platforms.get(device["platform"]["id"]):
-                continue
-
-            try:
-                if device.get("primary_ip", {}).get("address"):
-                    dev = device["primary_ip"]["address"].split("/")[0]
-                else:
-                    dev = device["name"]
-                devices[device["name"]] = DeviceImporter(
-                    dev,
-                    napalm_driver_name=platforms[
-                         device["platform"]["id"]
-                    ]["napalm_driver"],
-                    napalm_optional_args=platforms[
-                        device["platform"]["id"]
-                    ]["napalm_args"],
-                    creds=creds,
-                    discovery_protocol=yml["discovery_protocol"].get(
-                        platforms[device["platform"]["id"]]["napalm_driver"]
-                    )
-                )
-            except Exception as e:
-                logger.error(
-                    "Cannot connect to device %s: %s", device["name"], e
-                )
-    return devices
+
+    platforms = {}
+    for platform in iter_netbox_objects(netbox_api, "dcim/platforms/"):
+        if platform["napalm_driver"]:
+            platforms[platform["id"]] = {
+                "napalm_driver": platform["napalm_driver"],
+                "napalm_args": platform["napalm_args"]
+            }
+    if not platforms:
+        raise Exception("Not for one platform napalm_driver is not "
+                        "defined")
+
+    devlist = iter_netbox_objects(
+        netbox_api, "dcim/devices/", params=yml["filter"]
+    )
+    for device in devlist:
+        if not device.get("platform") or \
+                not platforms.get(device["platform"]["id"]):
+            continue
+
+        try:
+            if (device.get("primary_ip") or {}).get("address"):
+                dev = device["primary_ip"]["address"].split("/")[0]
+            else:
+                dev = device["name"]
+            yield device["name"], DeviceImporter(
+                dev,
+                napalm_driver_name=platforms[
+                     device["platform"]["id"]
+                ]["napalm_driver"],
+                napalm_optional_args=platforms[
+                    device["platform"]["id"]
+                ]["napalm_args"],
+                creds=creds,
+                discovery_protocol=yml["discovery_protocol"].get(
+                    platforms[device["platform"]["id"]]["napalm_driver"]
+                ),
+                parser_cache=parser_cache
+            )
+        except Exception as e:
+            logger.error(
+                "Cannot connect to device %s: %s", device["name"], e
+            )
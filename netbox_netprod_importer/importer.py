@@ -1,5 +1,6 @@
 from collections import defaultdict
 from contextlib import ContextDecorator
+import functools
 import logging
 import socket
 import napalm
@@ -13,51 +14,128 @@ from netbox_netprod_importer.tools import is_macaddr
 logger = logging.getLogger("netbox_importer")
 
 
+@functools.lru_cache(maxsize=None)
+def get_device_classes(napalm_driver_name):
+    """
+    Resolve the napalm driver and specific parser classes of a driver name
+
+    :return (driver_class, parser_class):
+    """
+    driver_class = napalm.get_network_driver(napalm_driver_name)
+    try:
+        parser_class = getattr(DeviceParsers, napalm_driver_name).value
+    except AttributeError:
+        logger.info(
+            "%s is not totally supported, will be limited to napalm "
+            "features", napalm_driver_name
+        )
+        parser_class = StubParser
+
+    return driver_class, parser_class
+
+
 class DeviceImporter(ContextDecorator):
+    """
+    Poll a device through napalm and its specific parser
+
+    The napalm driver and the parser are only instantiated when first needed,
+    and released when leaving the importer context.
+    """
 
     def __init__(self, hostname, napalm_driver_name, target=None, creds=None,
-                 napalm_optional_args=None, discovery_protocol='lldp'):
+                 napalm_optional_args=None, discovery_protocol='lldp',
+                 parser_cache=None):
+        """
+        :param parser_cache: ParserCache shared with other importers, each
+                             parser using a private one if None
+        """
         self.hostname = hostname
         if not creds:
             creds = (None, None)
+        self.creds = creds
         self.target = target or hostname
-
-        driver = napalm.get_network_driver(napalm_driver_name)
-        self.device = driver(
-            hostname=self.target, username=creds[0], password=creds[1],
-            optional_args=napalm_optional_args
-        )
-        self.specific_parser = self._get_specific_device_parser(
-            napalm_driver_name
-        )
-        self.discovery_protocol = discovery_protocol
         self.napalm_driver_name = napalm_driver_name
+        self.napalm_optional_args = napalm_optional_args
+        self.discovery_protocol = discovery_protocol
+        self.parser_cache = parser_cache
+
+        self._device = None
+        self._specific_parser = None
+
+    @property
+    def device(self):
+        if self._device is None:
+            driver, _ = get_device_classes(self.napalm_driver_name)
+            self._device = driver(
+                hostname=self.target, username=self.creds[0],
+                password=self.creds[1],
+                optional_args=self.napalm_optional_args
+            )
 
-    def _get_specific_device_parser(self, os):
-        try:
-            parser_class = getattr(DeviceParsers, os).value
-        except AttributeError:
-            logger.info(
-                "{} is not totally supported, will be limited to napalm "
-                "features"
+        return self._device
+
+    @property
+    def specific_parser(self):
+        if self._specific_parser is None:
+            self._specific_parser = self._get_specific_device_parser(
+                self.napalm_driver_name
             )
-            parser_class = StubParser
 
-        return parser_class(self.device)
+        return self._specific_parser
+
+    def _get_specific_device_parser(self, os):
+        _, parser_class = get_device_classes(os)
+        return parser_class(self.device, cache=self.parser_cache)
 
     def __enter__(self):
         return self.open()
 
     def __exit__(self, *exc):
-        if self.device.device:
+        if self._device is not None and self._device.device:
             self.close()
+        self.release()
+
+    def release(self):
+        """
+        Drop the napalm driver and the parser, to rebuild them on next use
+        """
+        self._device = None
+        self._specific_parser = None
+        self._invalidate_parser_cache()
 
     def open(self):
-        self.device.open()
+        # what was fetched during a previous session may be outdated
+        self._invalidate_parser_cache()
+
+        try:
+            self.device.open()
+        except Exception:
+            self.release()
+            raise
 
     def close(self):
         self.device.close()
 
+    def _invalidate_parser_cache(self):
+        if self.parser_cache is not None:
+            self.parser_cache.invalidate_device(self.target)
+
+    def prefetch(self, with_neighbours=False):
+        """
+        Let the specific parser fetch in advance what a poll needs
+
+        :param with_neighbours: the neighbours will also be fetched
+        """
+        assert self.device.device
+
+        neighbours_protocols = ()
+        if with_neighbours:
+            neighbours_protocols = {
+                "cdp": ("cdp",), "multiple": ("cdp", "lldp")
+            }.get(self.discovery_protocol, ("lldp",))
+
+        self.specific_parser.prefetch(neighbours_protocols)
+
     def poll(self):
         assert self.device.device
 
@@ -1,15 +1,23 @@
 from abc import ABC, abstractmethod
-from collections import defaultdict
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor
+import functools
+import ipaddress
+import itertools
 import logging
 from requests.exceptions import HTTPError
+import sys
 import threading
 
 import cachetools
 from netboxapi import NetboxMapper
 from tqdm import tqdm
 
+from netbox_netprod_importer.api import iter_netbox_objects
+from netbox_netprod_importer.cache import NetboxLookupCache
+from netbox_netprod_importer.results import get_props_hashes
 from netbox_netprod_importer.vendors.cisco import CiscoParser
 from netbox_netprod_importer.vendors.juniper import JuniperParser
 from netbox_netprod_importer.exceptions import (
@@ -17,17 +25,251 @@ from netbox_netprod_importer.exceptions import (
     NetIfPushingError
 )
 from netbox_netprod_importer.tools import (
-    generic_netbox_error, is_macaddr, macaddr_to_int
+    generic_netbox_error, get_netbox_obj_changes, is_macaddr, KeyedLocks,
+    macaddr_to_int
 )
 
 
 logger = logging.getLogger("netbox_importer")
 
 
+def get_netif_derivatives(netif):
+    """
+    :return derivatives: iterator over the names an interface can be known as
+    """
+    yield netif
+    yield CiscoParser.get_abrev_if(netif)
+    yield JuniperParser.get_real_ifname(netif)
+
+
+class IndexedInterfaces(dict):
+    """
+    {interface_name: netbox_interface_obj} of a device, indexed by each
+    derivative of the interfaces names and by mac address
+
+    Indexes are built on first lookup: the dict should not be modified after.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._by_derivative = None
+        self._by_mac = None
+
+    def get_by_derivative(self, netif):
+        """
+        :return interface: first interface having one of its derivatives
+                           equal to one of the netif derivatives, None if
+                           not found
+        """
+        if self._by_derivative is None:
+            by_derivative = {}
+            for if_name, interface in self.items():
+                for derivative in get_netif_derivatives(if_name):
+                    by_derivative.setdefault(derivative, interface)
+            self._by_derivative = by_derivative
+
+        for derivative in get_netif_derivatives(netif):
+            interface = self._by_derivative.get(derivative)
+            if interface is not None:
+                return interface
+
+        return None
+
+    def get_by_mac(self, macaddr):
+        """
+        :return interfaces: list of interfaces having this mac address
+        """
+        if self._by_mac is None:
+            by_mac = defaultdict(list)
+            for interface in self.values():
+                int_mac = macaddr_to_int(interface.mac_address)
+                if int_mac:
+                    by_mac[int_mac].append(interface)
+            self._by_mac = dict(by_mac)
+
+        return self._by_mac.get(macaddr_to_int(macaddr), [])
+
+
+class InterfaceRecord():
+    """
+    Compact copy of a netbox interface, keeping only what the
+    interconnection needs
+    """
+    __slots__ = ("id", "name", "mac_address", "device_id", "cable_id")
+
+    def __init__(self, id, name, mac_address=None, device_id=None,
+                 cable_id=None):
+        self.id = id
+        self.name = name
+        self.mac_address = mac_address
+        self.device_id = device_id
+        #: id of the cable connected when the interface was fetched
+        self.cable_id = cable_id
+
+    @classmethod
+    def from_netbox_obj(cls, netif):
+        """
+        :param netif: netbox interface obj, as returned by NetboxMapper
+        """
+        return cls(
+            netif.id, netif.name, netif.mac_address, netif._device_id,
+            getattr(netif, "_cable_id", None)
+        )
+
+    @classmethod
+    def from_json(cls, netif):
+        """
+        :param netif: netbox interface, as returned by the API
+        """
+        return cls(
+            netif["id"], netif["name"], netif.get("mac_address"),
+            netif["device"]["id"], (netif.get("cable") or {}).get("id")
+        )
+
+
+class InterfacesCache(cachetools.LRUCache):
+    """
+    Thread-safe LRU cache of {hostname: IndexedInterfaces}, bounded by the
+    total number of interfaces cached
+
+    Interfaces are stored as InterfaceRecord, netbox interface objs being
+    converted when set. Devices with more interfaces than the cache size are
+    not cached.
+    """
+
+    def __init__(self, maxsize):
+        """
+        :param maxsize: max number of interfaces cached, all devices included
+        """
+        super().__init__(maxsize, getsizeof=self._get_interfaces_size)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _get_interfaces_size(interfaces):
+        # devices without interfaces are still cached
+        return max(len(interfaces), 1)
+
+    def __getitem__(self, hostname):
+        with self._lock:
+            return super().__getitem__(hostname)
+
+    @staticmethod
+    def to_records(interfaces):
+        """
+        :param interfaces: {interface_name: netbox_interface_obj}
+        :return records: IndexedInterfaces of InterfaceRecord
+        """
+        if isinstance(interfaces, IndexedInterfaces):
+            return interfaces
+
+        return IndexedInterfaces(
+            (if_name, netif if isinstance(netif, InterfaceRecord)
+             else InterfaceRecord.from_netbox_obj(netif))
+            for if_name, netif in interfaces.items()
+        )
+
+    def __setitem__(self, hostname, interfaces):
+        records = self.to_records(interfaces)
+        if self.getsizeof(records) > self.maxsize:
+            logger.debug(
+                "Too many interfaces on %s to be cached", hostname
+            )
+            return
+
+        with self._lock:
+            super().__setitem__(hostname, records)
+
+    def __delitem__(self, hostname):
+        with self._lock:
+            super().__delitem__(hostname)
+
+    def __contains__(self, hostname):
+        with self._lock:
+            return super().__contains__(hostname)
+
+    def get(self, hostname, default=None):
+        with self._lock:
+            return super().get(hostname, default)
+
+    def pop(self, hostname, *default):
+        with self._lock:
+            return super().pop(hostname, *default)
+
+    def popitem(self):
+        with self._lock:
+            return super().popitem()
+
+    def is_full(self):
+        with self._lock:
+            return self.currsize >= self.maxsize
+
+
+class LinksRegistry():
+    """
+    Registry of the links discovered between devices, shared by all threads
+
+    A link is keyed on the unordered pair of its endpoints, each endpoint
+    being a (hostname, port) tuple. Only relies on atomic dict and set
+    operations, without lock, so a link can only be claimed once whatever
+    the number of threads.
+    """
+    __slots__ = ("_links", "_ports", "_tokens")
+
+    def __init__(self):
+        #: {(hostname, port, hostname, port): token of the link claimer}
+        self._links = {}
+        #: {hostname: set of ports part of a link}
+        self._ports = {}
+        self._tokens = itertools.count()
+
+    def __len__(self):
+        return len(self._links)
+
+    def claim(self, endpoint_a, endpoint_b):
+        """
+        Register a link, if not already registered
+
+        :return claimed: True if the link was registered by this call
+        """
+        token = next(self._tokens)
+        key = self._register(endpoint_a, endpoint_b, token)
+
+        return self._links[key] == token
+
+    def add(self, endpoint_a, endpoint_b):
+        """
+        Register a link, claimed or not
+        """
+        self._register(endpoint_a, endpoint_b, None)
+
+    def is_discovered(self, hostname, port):
+        return port in self._ports.get(hostname, ())
+
+    def _register(self, endpoint_a, endpoint_b, token):
+        endpoint_a = tuple(sys.intern(i) for i in endpoint_a)
+        endpoint_b = tuple(sys.intern(i) for i in endpoint_b)
+        for hostname, port in (endpoint_a, endpoint_b):
+            self._ports.setdefault(hostname, set()).add(port)
+
+        # flat tuple, smaller than a tuple of endpoints
+        if endpoint_a <= endpoint_b:
+            key = endpoint_a + endpoint_b
+        else:
+            key = endpoint_b + endpoint_a
+        self._links.setdefault(key, token)
+
+        return key
+
+
 class _NetboxPusher(ABC):
 
-    def __init__(self, netbox_api, *args, **kwargs):
+    def __init__(self, netbox_api, *args, lookup_cache=None, **kwargs):
+        """
+        :param lookup_cache: NetboxLookupCache to share between pushers. A
+                             private one is used if not set
+        """
         self.netbox_api = netbox_api
+        self.lookup_cache = lookup_cache or NetboxLookupCache()
 
         self._mappers = {
             "dcim_choices": NetboxMapper(
@@ -44,53 +286,195 @@ class _NetboxPusher(ABC):
                 self.netbox_api, app_name="ipam", model="vlans"
             )
         }
-        self._choices_cache = {}
+        #: number of objects written or skipped as unchanged
+        self.stats = Counter(written=0, skipped=0)
+        self._stats_lock = threading.Lock()
 
     @abstractmethod
     def push(self):
         pass
 
+    def _count(self, stat, number=1):
+        with self._stats_lock:
+            self.stats[stat] += number
+
+    def _push_changes(self, netbox_obj, wanted_props):
+        """
+        Only patch the fields of a netbox object that changed
+
+        :return changes: {field: value} of what has been pushed, empty if the
+                         object was already up to date
+        """
+        changes = get_netbox_obj_changes(netbox_obj, wanted_props)
+        if not changes:
+            self._count("skipped")
+            return changes
+
+        route = "{}{}/".format(
+            self.netbox_api.build_model_route(
+                netbox_obj.__app_name__, netbox_obj.__model__
+            ), netbox_obj.id
+        )
+        self.netbox_api.patch(route, json={
+            k: v.id if isinstance(v, NetboxMapper) else v
+            for k, v in changes.items()
+        })
+        for k, v in changes.items():
+            setattr(netbox_obj, k, v)
+        self._count("written")
+
+        return changes
+
+    def _bulk_request(self, app_name, model, method, objects):
+        """
+        Create, update or delete multiple objects through a bulk endpoint
+        """
+        route = self.netbox_api.build_model_route(app_name, model)
+        response = getattr(self.netbox_api, method)(route, json=objects)
+        self._count("written", len(objects))
+
+        return response
+
+    def _iter_mappers(self, mapper_name, page_size, **params):
+        """
+        List netbox objects as mappers of mapper_name, matching params
+
+        Pages are followed by the number of objects netbox really returned,
+        as it can be capped by its MAX_PAGE_SIZE, where `NetboxMapper.get`
+        would skip objects.
+
+        :param page_size: number of objects asked per page
+        """
+        mapper = self._mappers[mapper_name]
+        route = self.netbox_api.build_model_route(
+            mapper.__app_name__, mapper.__model__
+        )
+        params = {
+            k: v.id if isinstance(v, NetboxMapper) else v
+            for k, v in params.items()
+        }
+        for props in iter_netbox_objects(
+                self.netbox_api, route, params=params, page_size=page_size
+        ):
+            yield mapper._build_new_mapper_from(
+                props, "{}{}/".format(route, props["id"])
+            )
+
     def search_value_in_choices(self, mapper_name, id, label):
-        if mapper_name not in self._choices_cache:
-            try:
-                mapper = self._mappers[mapper_name]
-                self._choices_cache[mapper_name] = next(mapper.get())
-            except StopIteration:
-                pass
+        choices = self.lookup_cache.get_or_fetch(
+            "choices", mapper_name,
+            lambda: next(self._mappers[mapper_name].get(), None)
+        )
 
-        for choice in self._choices_cache[mapper_name][id]:
+        for choice in choices[id]:
             if choice["label"] == label:
                 return choice["value"]
 
         raise KeyError("Label {} not in choices".format(label))
 
+    def _get_device(self, hostname):
+        device = self.lookup_cache.get_or_fetch(
+            "devices", hostname,
+            lambda: next(self._mappers["devices"].get(name=hostname), None)
+        )
+        if device is None:
+            raise DeviceNotFoundError(hostname)
+
+        return device
+
 
 class NetboxDevicePropsPusher(_NetboxPusher):
     _device = None
+    #: page size used to list all interfaces of a device in bulk mode
+    bulk_page_size = 1000
+    #: number of ip addresses searched in each request to index them
+    ip_lookup_batch_size = 100
 
     def __init__(self, netbox_api, hostname, props, *args, overwrite=False,
-                 **kwargs):
+                 bulk=False, interfaces_cache=None, preload_vlans=False,
+                 results_store=None, force=False, **kwargs):
+        """
+        :param interfaces_cache: if set, InterfacesCache filled with
+            {hostname: {interface_name: netbox_interface_obj}} once the
+            device is pushed, to be reused by the interconnection. Only filled
+            with bulk or overwrite, when all interfaces of the device are known
+        :param preload_vlans: fetch all vlans of the device site, and all
+            global vlans, in one listing each instead of one query per vlan
+        :param results_store: PollResultsStore, to skip the device, or the
+            interfaces, unchanged since their last successful push, and to
+            save the results once pushed
+        :param force: push everything, even if unchanged in results_store
+        """
         super().__init__(netbox_api, *args, **kwargs)
 
         self.hostname = hostname
         self.props = props
         self.overwrite = overwrite
-        self.vlans_cache = cachetools.LRUCache(4096)
+        self.bulk = bulk
+        self.preload_vlans = preload_vlans
+        self.interfaces_cache = interfaces_cache
+        self.results_store = results_store
+        self.force = force
+
+        #: interfaces unchanged since their last push, not pushed again
+        self._unchanged_interfaces = set()
 
     @generic_netbox_error
     def push(self):
-        try:
-            self._device = next(
-                self._mappers["devices"].get(name=self.hostname)
-            )
-        except StopIteration:
-            raise DeviceNotFoundError(self.hostname)
+        if self.results_store is not None:
+            hashes = get_props_hashes(self.props, overwrite=self.overwrite)
+            if not self.force and self._load_unchanged(*hashes):
+                logger.info(
+                    "Device %s unchanged since its last push, skipped",
+                    self.hostname
+                )
+                return
 
-        if self.overwrite:
-            self._clean_unmatched_interfaces()
-        self._push_interfaces()
+        self._device = self._get_device(self.hostname)
+        self._index_ip_addresses(*self._get_polled_ip_addresses())
+
+        if self.bulk:
+            interfaces = self._sync_interfaces()
+        else:
+            if self.overwrite:
+                self._clean_unmatched_interfaces()
+            interfaces = self._push_interfaces()
         self._push_main_data()
 
+        all_interfaces_known = self.bulk or (
+            self.overwrite and not self._unchanged_interfaces
+        )
+        if self.interfaces_cache is not None and all_interfaces_known:
+            self.interfaces_cache[self.hostname] = interfaces
+
+        if self.results_store is not None:
+            self.results_store.save(self.hostname, *hashes)
+
+        logger.info(
+            "Device %s: %s object(s) written, %s unchanged",
+            self.hostname, self.stats["written"], self.stats["skipped"]
+        )
+
+    def _load_unchanged(self, device_hash, interfaces_hashes):
+        """
+        Compare the polled hashes with the last pushed ones
+
+        Fill `_unchanged_interfaces` with the interfaces having the same hash.
+
+        :return unchanged: True if the whole device is unchanged
+        """
+        pushed_device_hash, pushed_interfaces_hashes = (
+            self.results_store.get_hashes(self.hostname)
+        )
+        if device_hash == pushed_device_hash:
+            return True
+
+        self._unchanged_interfaces = set(
+            if_name for if_name, if_hash in interfaces_hashes.items()
+            if pushed_interfaces_hashes.get(if_name) == if_hash
+        )
+        return False
+
     def _clean_unmatched_interfaces(self):
         # Interfaces are all forced to be fetched, as some of them will them
         # be deleting, messing with the offset used by the query to fetch the
@@ -107,18 +491,32 @@ class NetboxDevicePropsPusher(_NetboxPusher):
     def _clean_attached_ip(self, netbox_if):
         attached_addrs = self._mappers["ip"].get(interface_id=netbox_if)
         for a in attached_addrs:
-            a.delete()
+            self._delete_ip_address(a)
+
+    def _delete_ip_address(self, netbox_ip):
+        netbox_ip.delete()
+        for key in (netbox_ip.address, netbox_ip.address.split("/")[0]):
+            self.lookup_cache.invalidate("ip", key)
 
     def _push_interfaces(self):
         interfaces_props = self.props["interfaces"]
         interfaces_lag = {}
         interfaces = {}
 
-        for if_name, if_prop in interfaces_props.items():
-            if_prop = if_prop.copy()
-            if_prop["type"] = self.search_value_in_choices(
-                "dcim_choices", "interface:type", if_prop["type"]
+        if self._unchanged_interfaces:
+            # recreate the unchanged interfaces deleted since their last push
+            self._unchanged_interfaces &= set(
+                netbox_if.name for netbox_if in self._iter_mappers(
+                    "interfaces", self.bulk_page_size, device_id=self._device
+                )
             )
+
+        for if_name, if_prop in interfaces_props.items():
+            if if_name in self._unchanged_interfaces:
+                self._count("skipped")
+                continue
+
+            wanted_props = self._serialize_interface_props(if_prop)
             interface_query = self._mappers["interfaces"].get(
                 device_id=self._device, name=if_name
             )
@@ -127,42 +525,18 @@ class NetboxDevicePropsPusher(_NetboxPusher):
             except StopIteration:
                 try:
                     interface = self._mappers["interfaces"].post(
-                        device=self._device, name=if_name, type=if_prop["type"]
+                        device=self._device, name=if_name,
+                        type=wanted_props["type"]
                     )
                 except HTTPError as e:
                     raise NetIfPushingError(if_name, e)
 
             interfaces[if_name] = interface
             if if_prop.get("lag"):
-                interfaces_lag[if_name] = if_prop.pop("lag")
-
-            if not self.overwrite and "mode" in if_prop:
-                if_prop.pop("mode")
-            elif if_prop.get("mode"):
-                # cannot really guess (yet) the interface mode, so only set it
-                # if overwrite
-                self._handle_interface_mode(interface, if_prop["mode"])
-                if_prop.pop("mode")
-
-            if if_prop["untagged_vlan"]:
-                vlan_id = self._get_vlan_id(if_prop["untagged_vlan"])
-                if vlan_id != -1:
-                    setattr(interface, "untagged_vlan", vlan_id)
-
-            if_prop.pop("untagged_vlan")
-            if len(if_prop["tagged_vlans"]):
-                setattr(interface, "tagged_vlans", [])
-                for vlan in if_prop["tagged_vlans"]:
-                    vlan_id = self._get_vlan_id(vlan)
-                    if vlan_id != -1:
-                        interface.tagged_vlans.append(vlan_id)
-            if_prop.pop("tagged_vlans")
-
-            for k, v in if_prop.items():
-                setattr(interface, k, v)
+                interfaces_lag[if_name] = if_prop["lag"]
 
             try:
-                interface.put()
+                self._push_changes(interface, wanted_props)
             except HTTPError as e:
                 raise NetIfPushingError(interface.name, e)
             if if_prop.get("ip"):
@@ -174,59 +548,297 @@ class NetboxDevicePropsPusher(_NetboxPusher):
 
         self._update_interfaces_lag(interfaces, interfaces_lag)
 
-    def _get_vlan_id(self, vlan):
-        if not self.vlans_cache.get(self._device.site.id):
-            self.vlans_cache[self._device.site.id] = {}
+        return interfaces
 
-        if not self.vlans_cache[self._device.site.id].get(vlan):
-            vlans = list(self._mappers["vlan"].get(
-                    site_id=self._device.site.id,
-                    vid=vlan
-                )
-            )
-            # Ignore vlan 1 because it is usually not used.
-            # But if he is assign.
-            if len(vlans) == 0 and vlan != 1:
-                logger.info("Switch %s, vlan %s not faund on site %s",
-                            self.hostname, vlan, self._device.site.name)
-                # If set to None, then if not None will always trigger.
-                # Searches will occur every time.
-                self.vlans_cache[self._device.site.id][vlan] = -1
-            elif len(vlans) == 1:
-                self.vlans_cache[self._device.site.id][vlan] = vlans[0].id
+    def _sync_interfaces(self):
+        """
+        Sync interfaces by using the Netbox bulk endpoints
+
+        All interfaces of the device are fetched in one listing and compared
+        in memory with the polled ones. Only creations, updates of changed
+        interfaces and deletions (with overwrite) are sent, each one as a
+        single bulk request.
+        """
+        pushed_interfaces = self._get_pushed_interfaces_by_name()
+        # recreate the unchanged interfaces deleted since their last push
+        self._unchanged_interfaces &= set(pushed_interfaces)
+        if self.overwrite:
+            self._bulk_delete_unmatched_interfaces(pushed_interfaces)
+
+        interfaces_lag = {}
+        interfaces_to_create = []
+        interfaces_to_update = []
+        for if_name, if_prop in self.props["interfaces"].items():
+            if if_name in self._unchanged_interfaces:
+                self._count("skipped")
+                continue
+
+            if if_prop.get("lag"):
+                interfaces_lag[if_name] = if_prop["lag"]
+
+            wanted_props = self._serialize_interface_props(if_prop)
+            netbox_if = pushed_interfaces.get(if_name)
+            if netbox_if is None:
+                interfaces_to_create.append(dict(
+                    wanted_props, device=self._device.id, name=if_name
+                ))
+                continue
+
+            changes = get_netbox_obj_changes(netbox_if, wanted_props)
+            if changes:
+                changes["id"] = netbox_if.id
+                interfaces_to_update.append(changes)
             else:
-                logger.info(
-                    "Number of found Vlans %s on the site %s is more than one",
-                    vlan, self._device.site.name
+                self._count("skipped")
+
+        if interfaces_to_create:
+            self._bulk_interfaces_request("post", interfaces_to_create)
+            pushed_interfaces = self._get_pushed_interfaces_by_name()
+        if interfaces_to_update:
+            self._bulk_interfaces_request("patch", interfaces_to_update)
+
+        self._bulk_update_interfaces_lag(pushed_interfaces, interfaces_lag)
+
+        for if_name, if_prop in self.props["interfaces"].items():
+            if if_name in self._unchanged_interfaces:
+                continue
+
+            if if_prop.get("ip"):
+                interface = pushed_interfaces[if_name]
+                addrs = self._attach_interface_to_ip_addresses(
+                    interface, *if_prop["ip"]
                 )
-                self.vlans_cache[self._device.site.id][vlan] = -1
-        return self.vlans_cache[self._device.site.id][vlan]
+                if self.overwrite:
+                    self._clean_unmatched_ip_addresses(interface, *addrs)
 
+        return pushed_interfaces
 
-    def _handle_interface_mode(self, netbox_if, mode):
-        netbox_mode = self.search_value_in_choices(
-            "dcim_choices", "interface:mode",
-            mode
+    def _get_pushed_interfaces_by_name(self):
+        return {
+            netbox_if.name: netbox_if
+            for netbox_if in self._iter_mappers(
+                "interfaces", self.bulk_page_size, device_id=self._device
+            )
+        }
+
+    def _bulk_delete_unmatched_interfaces(self, pushed_interfaces):
+        interfaces_to_delete = []
+        for if_name in tuple(pushed_interfaces):
+            if if_name not in self.props["interfaces"]:
+                netbox_if = pushed_interfaces.pop(if_name)
+                self._clean_attached_ip(netbox_if)
+                interfaces_to_delete.append({"id": netbox_if.id})
+
+        if interfaces_to_delete:
+            self._bulk_interfaces_request("delete", interfaces_to_delete)
+
+    def _bulk_update_interfaces_lag(self, pushed_interfaces, interfaces_lag):
+        interfaces_to_update = []
+        for if_name, lag in interfaces_lag.items():
+            if lag not in pushed_interfaces:
+                self._log_missing_lag(if_name, lag)
+                continue
+
+            netbox_if = pushed_interfaces[if_name]
+            changes = get_netbox_obj_changes(
+                netbox_if, {"lag": pushed_interfaces[lag].id}
+            )
+            if changes:
+                changes["id"] = netbox_if.id
+                interfaces_to_update.append(changes)
+
+        if interfaces_to_update:
+            self._bulk_interfaces_request("patch", interfaces_to_update)
+
+    def _bulk_interfaces_request(self, method, interfaces):
+        return self._bulk_request("dcim", "interfaces", method, interfaces)
+
+    def _serialize_interface_props(self, if_prop):
+        """
+        Convert polled interface properties to what Netbox expects
+
+        :return serialized: {field: value}, only containing the fields that
+                            should be pushed
+        """
+        serialized = {
+            k: v for k, v in if_prop.items()
+            if k not in ("ip", "lag", "mode", "untagged_vlan", "tagged_vlans")
+        }
+        serialized["type"] = self.search_value_in_choices(
+            "dcim_choices", "interface:type", if_prop["type"]
+        )
+
+        # cannot really guess (yet) the interface mode, so only set it if
+        # overwrite
+        if self.overwrite and if_prop.get("mode"):
+            serialized["mode"] = self.search_value_in_choices(
+                "dcim_choices", "interface:mode", if_prop["mode"]
+            )
+
+        if if_prop.get("untagged_vlan"):
+            vlan_id = self._get_vlan_id(if_prop["untagged_vlan"])
+            if vlan_id != -1:
+                serialized["untagged_vlan"] = vlan_id
+
+        if if_prop.get("tagged_vlans"):
+            serialized["tagged_vlans"] = [
+                vlan_id for vlan_id in map(
+                    self._get_vlan_id, if_prop["tagged_vlans"]
+                ) if vlan_id != -1
+            ]
+
+        return serialized
+
+    def _get_vlan_id(self, vlan):
+        if self.preload_vlans:
+            vlan_id = self._get_vlan_id_from_tables(vlan)
+            if vlan_id is not None:
+                return vlan_id
+
+        return self.lookup_cache.get_or_fetch(
+            "vlans", (self._device.site.id, vlan),
+            lambda: self._fetch_vlan_id(vlan)
+        )
+
+    def _fetch_vlan_id(self, vlan):
+        vlans = list(self._mappers["vlan"].get(
+                site_id=self._device.site.id,
+                vid=vlan
+            )
+        )
+        return self._select_vlan_id(vlan, [v.id for v in vlans])
+
+    def _get_vlan_id_from_tables(self, vlan):
+        """
+        :return vlan_id: None if not in the preloaded tables, as the vlan
+                         could have been created since
+        """
+        try:
+            vid = int(vlan)
+        except (ValueError, TypeError):
+            return self._select_vlan_id(vlan, [])
+
+        vlans_ids = (
+            self._get_vlans_table(self._device.site.id).get(vid) or
+            self._get_vlans_table(None).get(vid)
+        )
+        if not vlans_ids:
+            return None
+
+        return self._select_vlan_id(vlan, vlans_ids)
+
+    def _get_vlans_table(self, site_id):
+        """
+        :param site_id: site of the vlans, None for the global vlans
+        :return vlans_table: {vid: [vlan_id, ...]}
+        """
+        return self.lookup_cache.get_or_fetch(
+            "vlans", ("table", site_id),
+            lambda: self._fetch_vlans_table(site_id)
+        )
+
+    def _fetch_vlans_table(self, site_id):
+        vlans_table = defaultdict(list)
+        vlans = self._iter_mappers(
+            "vlan", self.bulk_page_size,
+            site_id="null" if site_id is None else site_id
+        )
+        for v in vlans:
+            vlans_table[v.vid].append(v.id)
+
+        return dict(vlans_table)
+
+    def _select_vlan_id(self, vlan, vlans_ids):
+        # Ignore vlan 1 because it is usually not used.
+        # But if he is assign.
+        if len(vlans_ids) == 0 and vlan != 1:
+            logger.info("Switch %s, vlan %s not faund on site %s",
+                        self.hostname, vlan, self._device.site.name)
+            # If set to None, then if not None will always trigger.
+            # Searches will occur every time.
+            return -1
+        elif len(vlans_ids) == 1:
+            return vlans_ids[0]
+        else:
+            logger.info(
+                "Number of found Vlans %s on the site %s is more than one",
+                vlan, self._device.site.name
+            )
+            return -1
+
+    def _get_ip_addresses(self, ip):
+        """
+        :param ip: address, with a prefix length to only match this one or
+                   without to match any prefix length
+        :return addresses: list of netbox ip objects matching ip
+        """
+        return self.lookup_cache.get_or_fetch(
+            "ip", ip, lambda: list(self._mappers["ip"].get(address=ip))
+        )
+
+    def _get_polled_ip_addresses(self):
+        for if_name, if_prop in self.props.get("interfaces", {}).items():
+            if if_name not in self._unchanged_interfaces:
+                yield from if_prop.get("ip") or ()
+
+        for ip_key in ("primary_ip4", "primary_ip6"):
+            if self.props.get(ip_key):
+                yield self.props[ip_key]
+
+    def _index_ip_addresses(self, *ip_addresses):
+        """
+        Fetch ip addresses by batch and add them in the lookup cache
+
+        Use the exact `address` filter, which accepts multiple values, instead
+        of a search for each address.
+        """
+        ip_addresses = set(ip_addresses)
+        missing_ips = sorted(
+            ip_addresses -
+            set(self.lookup_cache.get_many("ip", ip_addresses))
         )
 
-        netbox_if.mode = netbox_mode
+        batch_size = self.ip_lookup_batch_size
+        for i in range(0, len(missing_ips), batch_size):
+            batch = missing_ips[i:i + batch_size]
+            addresses_by_host = defaultdict(list)
+            for netbox_ip in self._iter_mappers(
+                    "ip", self.bulk_page_size, address=batch
+            ):
+                host = ipaddress.ip_interface(netbox_ip.address).ip
+                addresses_by_host[host].append(netbox_ip)
+
+            for ip in batch:
+                ip_interface = ipaddress.ip_interface(ip)
+                matching_addresses = [
+                    a for a in addresses_by_host[ip_interface.ip]
+                    if "/" not in ip or
+                    ipaddress.ip_interface(a.address) == ip_interface
+                ]
+                self.lookup_cache.set("ip", ip, matching_addresses)
 
     def _attach_interface_to_ip_addresses(self, netbox_if, *ip_addresses):
         mapper = self._mappers["ip"]
 
         addresses = []
         for ip in ip_addresses:
+            matching_addresses = self._get_ip_addresses(ip)
             # check if ip attached isn't already correct
             try:
-                ip_netbox_obj = next(mapper.get(q=ip, interface_id=netbox_if))
+                ip_netbox_obj = next(
+                    a for a in matching_addresses
+                    if a.to_dict().get("interface") == netbox_if.id
+                )
             except StopIteration:
                 try:
-                    ip_netbox_obj = next(mapper.get(q=ip))
-                except StopIteration:
+                    ip_netbox_obj = matching_addresses[0]
+                except IndexError:
                     try:
                         ip_netbox_obj = mapper.post(address=ip)
                     except HTTPError as e:
                         raise IPPushingError(ip, e)
+                    self.lookup_cache.set("ip", ip, [ip_netbox_obj])
+                    self.lookup_cache.invalidate("ip", ip.split("/")[0])
 
                 # XXX: handle anycast
                 ip_netbox_obj.interface = netbox_if
@@ -245,7 +857,7 @@ class NetboxDevicePropsPusher(_NetboxPusher):
 
         for addr in attached_addrs:
             if addr.id not in netbox_ip_ids:
-                addr.delete()
+                self._delete_ip_address(addr)
 
     def _update_interfaces_lag(self, interfaces, interfaces_lag):
         """
@@ -253,54 +865,178 @@ class NetboxDevicePropsPusher(_NetboxPusher):
         """
         for if_name, lag in interfaces_lag.items():
             interface = interfaces[if_name]
-            interface.lag = interfaces[lag]
+            if lag not in interfaces:
+                # lag unchanged since its last push, so not fetched
+                netbox_lag = next(self._mappers["interfaces"].get(
+                    device_id=self._device, name=lag
+                ), None)
+                if netbox_lag is None:
+                    self._log_missing_lag(if_name, lag)
+                    continue
+                interfaces[lag] = netbox_lag
             try:
-                interface.put()
+                self._push_changes(interface, {"lag": interfaces[lag]})
             except HTTPError as e:
                 raise NetIfPushingError(interface.name, e)
 
+    def _log_missing_lag(self, if_name, lag):
+        logger.warning(
+            "Switch %s, lag %s of interface %s not found in netbox, skipped",
+            self.hostname, lag, if_name
+        )
+
     def _push_main_data(self):
-        mapper = self._mappers["ip"]
+        device_props = {}
         if self.props.get("serial"):
-            self._device.serial = self.props["serial"]
+            device_props["serial"] = self.props["serial"]
 
         for ip_key in ("primary_ip4", "primary_ip6"):
             ip = self.props.get(ip_key)
             if ip:
                 try:
-                    ip_netbox_obj = next(mapper.get(q=ip))
-                    setattr(self._device, ip_key, ip_netbox_obj)
-                except StopIteration:
+                    device_props[ip_key] = self._get_ip_addresses(ip)[0]
+                except IndexError:
                     logger.error(
                         "Cannot set primary IP %s as it does not exist in "
                         "netbox", ip
                     )
 
-        self._device.put()
+        self._push_changes(self._device, device_props)
 
 
 class NetboxInterconnectionsPusher(_NetboxPusher):
     """
     Push in Netbox a graph representing the interconnections between devices
     """
-
-    def __init__(self, *args, remove_domains=None, **kwargs):
+    #: page size used to list the cables of the devices in two phase mode
+    bulk_page_size = 1000
+    #: number of devices whose cables are listed in each request
+    cables_lookup_batch_size = 100
+    #: number of devices whose interfaces are listed in each request when
+    #: pre-warming the interfaces cache
+    interfaces_prewarm_batch_size = 50
+
+    def __init__(self, *args, remove_domains=None,
+                 interfaces_cache_size=200000, **kwargs):
+        """
+        :param interfaces_cache_size: max number of interfaces kept in cache,
+                                      all devices included
+        """
         super().__init__(*args, **kwargs)
 
         self.remove_domains = remove_domains or []
-        self.interfaces_cache = cachetools.LRUCache(128)
-        self._lock = threading.Lock()
+        self.interfaces_cache = InterfacesCache(interfaces_cache_size)
+        #: locks of the interfaces being interconnected, by interface id
+        self._netif_locks = KeyedLocks()
 
-    def push(self, importers, threads=1, overwrite=False):
+    def push(self, importers, threads=1, overwrite=False, neighbours=None,
+             two_phase=False):
+        """
+        :param neighbours: {hostname: neighbours}, neighbours already fetched
+            for each device (None if they could not be), as returned by
+            `DeviceImporter.get_neighbours()`. If set, devices are not polled.
+        :param two_phase: first resolve the links of all devices, then
+            reconcile all their cables at once with bulk requests, instead of
+            pushing each link when found
+        """
         result = {"done": 0, "errors_interco": 0, "errors_device": 0}
 
+        if two_phase:
+            links = []
+            polled_hostnames = []
+            kept_netifs_ids = set()
+            device_results = self._handle_devices(
+                importers, threads, neighbours, self._get_device_links, result
+            )
+            for host, (device_links, unresolved, errors) in device_results:
+                polled_hostnames.append(host)
+                links.extend(device_links)
+                kept_netifs_ids.update(unresolved)
+                result["errors_interco"] += errors
+
+            self._reconcile_cables(
+                links, polled_hostnames, overwrite, result,
+                kept_netifs_ids=kept_netifs_ids
+            )
+        else:
+            discovered = LinksRegistry()
+            device_results = self._handle_devices(
+                importers, threads, neighbours, functools.partial(
+                    self._handle_device, discovered=discovered,
+                    overwrite=overwrite
+                ), result
+            )
+            for host, task_result in device_results:
+                result["done"] += task_result["done"]
+                result["errors_interco"] += task_result["errors"]
+
+        return result
+
+    def prewarm_interfaces_cache(self, hostnames):
+        """
+        Fetch the interfaces of all devices not cached yet, in a few bulk
+        listings
+
+        Stop once the cache is full, as next devices would evict the previous
+        ones.
+
+        :return nb_devices: number of devices cached
+        """
+        hostnames = sorted(
+            h for h in hostnames if h not in self.interfaces_cache
+        )
+        route = self.netbox_api.build_model_route("dcim", "interfaces")
+        batch_size = self.interfaces_prewarm_batch_size
+        nb_devices = 0
+        for i in range(0, len(hostnames), batch_size):
+            if self.interfaces_cache.is_full():
+                logger.debug(
+                    "Interfaces cache full, %s device(s) not pre-warmed",
+                    len(hostnames) - i
+                )
+                break
+
+            batch = hostnames[i:i + batch_size]
+            interfaces_by_device = {}
+            netbox_interfaces = iter_netbox_objects(
+                self.netbox_api, route, params={"device": batch},
+                page_size=self.bulk_page_size
+            )
+            for netif in netbox_interfaces:
+                interfaces_by_device.setdefault(
+                    netif["device"]["name"], IndexedInterfaces()
+                )[netif["name"]] = InterfaceRecord.from_json(netif)
+
+            # devices missing in netbox are not cached, to be reported later
+            for hostname, interfaces in interfaces_by_device.items():
+                self.interfaces_cache[hostname] = interfaces
+                nb_devices += 1
+
+        return nb_devices
+
+    def _handle_devices(self, importers, threads, neighbours, task, result):
+        """
+        Run task(hostname, importer, neighbours=neighbours) for each device
+
+        Failing devices are counted in result["errors_device"].
+
+        :return results: iterator of (hostname, task result)
+        """
         importers = importers.copy()
         with ThreadPoolExecutor(max_workers=threads) as executor:
             futures = {}
-            discovered = defaultdict(dict)
             for host, importer in importers.items():
+                if neighbours is None:
+                    device_neighbours = None
+                elif neighbours.get(host) is not None:
+                    device_neighbours = neighbours[host]
+                else:
+                    logger.debug("No neighbours fetched for %s", host)
+                    result["errors_device"] += 1
+                    continue
+
                 future = executor.submit(
-                    self._handle_device, host, importer, discovered, overwrite
+                    task, host, importer, neighbours=device_neighbours
                 )
                 futures[future] = host
 
@@ -311,9 +1047,7 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
             for future in futures_with_progress:
                 host = futures[future]
                 try:
-                    task_result = future.result()
-                    result["done"] += task_result["done"]
-                    result["errors_interco"] += task_result["errors"]
+                    yield host, future.result()
                 except ValueError:
                     logger.debug(
                         "LLDP parsing not supported on {}".format(host)
@@ -327,51 +1061,54 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
                     result["errors_device"] += 1
                 importers.pop(host)
 
-        return result
+    def _handle_device(self, hostname, importer, discovered, overwrite,
+                       neighbours=None):
+        if neighbours is None:
+            with importer:
+                return self._push_device_neighbours(
+                    hostname, importer, importer.get_neighbours(), discovered,
+                    overwrite
+                )
+
+        return self._push_device_neighbours(
+            hostname, importer, neighbours, discovered, overwrite
+        )
 
-    def _handle_device(self, hostname, importer, discovered, overwrite):
+    def _push_device_neighbours(self, hostname, importer, neighbours,
+                                discovered, overwrite):
         result = {"done": 0, "errors": 0}
-        with importer:
-            for interco in importer.get_neighbours():
-                already_discovered = (
-                    discovered[importer.hostname].get(
-                        interco["local_port"], None
-                    ) == (interco["hostname"], interco["port"])
-                )
-                if already_discovered:
-                    continue
+        for interco in neighbours:
+            claimed = discovered.claim(
+                (hostname, interco["local_port"]),
+                (self._remove_domain(interco["hostname"]), interco["port"])
+            )
+            if not claimed:
+                continue
 
+            try:
                 try:
-                    discovered[importer.hostname][interco["local_port"]] = (
-                        interco["hostname"], interco["port"]
-                    )
-                    discovered[interco["hostname"]][interco["port"]] = (
-                        importer.hostname, interco["local_port"]
+                    netif_connection = self._interconnect_using_lldp_names(
+                        hostname, importer, interco
                     )
+                except DeviceNotFoundError:
+                    if "chassis_id" not in interco:
+                        raise
 
-                    try:
-                        netif_connection = self._interconnect_using_lldp_names(
-                            hostname, importer, interco
-                        )
-                    except DeviceNotFoundError:
-                        if "chassis_id" not in interco:
-                            raise
-
-                        netif_connection = self._interconnect_using_lldp_id(
-                            hostname, importer, interco
-                        )
-
-                    self._update_discovered_from_netif_connection(
-                        discovered, netif_connection
+                    netif_connection = self._interconnect_using_lldp_id(
+                        hostname, importer, interco
                     )
 
-                    result["done"] += 1
-                    logger.debug("True with interco %s:", interco)
-                except Exception as e:
-                    result["errors"] += 1
-                    logger.warning("Switch %s Error with interco %s: %s",
-                                   hostname, interco, e)
-                    continue
+                self._update_discovered_from_netif_connection(
+                    discovered, netif_connection
+                )
+
+                result["done"] += 1
+                logger.debug("True with interco %s:", interco)
+            except Exception as e:
+                result["errors"] += 1
+                logger.warning("Switch %s Error with interco %s: %s",
+                               hostname, interco, e)
+                continue
 
         if overwrite:
             self._clean_undetected_intercos(hostname, discovered)
@@ -382,21 +1119,11 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
     def _interconnect_using_lldp_names(self, hostname, importer, interco):
         a = hostname
         netif_a = self._get_netif_or_derivative(a, interco["local_port"])
-        b = interco["hostname"]
-
-        for dom in self.remove_domains:
-            dom = "." + dom.lstrip(".").rstrip(".")
-            if b.endswith(dom):
-                b = b.rstrip(dom)
-                break
-
+        b = self._remove_domain(interco["hostname"])
         netif_b = self._get_netif_or_derivative(b, interco["port"])
 
-        with self._lock:
-            # force a refresh of the interfaces
-            netif_a = next(netif_a.get())
-            netif_b = next(netif_b.get())
-            return self.interconnect_netbox_netif(netif_a, netif_b)
+        with self._lock_netifs_and_peers(netif_a, netif_b) as netifs:
+            return self.interconnect_netbox_netif(*netifs)
 
     @generic_netbox_error
     def _interconnect_using_lldp_id(self, hostname, importer, interco):
@@ -406,11 +1133,236 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
             interco["chassis_id"], interco["port"]
         )
 
-        with self._lock:
-            # force a refresh of the interfaces
-            netif_a = next(netif_a.get())
-            netif_b = next(netif_b.get())
-            return self.interconnect_netbox_netif(netif_a, netif_b)
+        with self._lock_netifs_and_peers(netif_a, netif_b) as netifs:
+            return self.interconnect_netbox_netif(*netifs)
+
+    @contextmanager
+    def _lock_netifs_and_peers(self, *netifs):
+        """
+        Hold the locks of interfaces and of their current peers, whose cable
+        can be updated or deleted as well
+
+        Interfaces are refreshed under the locks. If a peer is not locked
+        yet, all locks are released and acquired again with it, in the same
+        sorted order, until the peers are stable.
+
+        :return netifs: list of up to date netbox interfaces
+        """
+        locked_ids = {netif.id for netif in netifs}
+        while True:
+            with self._netif_locks.acquire(*locked_ids):
+                netifs = [self._fetch_netif(netif) for netif in netifs]
+                # foreign key id, to not fetch the peers
+                peers_ids = {
+                    getattr(netif, "_connected_endpoint_id", None)
+                    for netif in netifs
+                } - {None}
+                if peers_ids <= locked_ids:
+                    yield netifs
+                    return
+
+            locked_ids |= peers_ids
+
+    def _fetch_netif(self, netif):
+        """
+        :return netif: up to date netbox interface obj of a cached interface
+        """
+        return next(self._mappers["interfaces"].get(netif.id))
+
+    def _remove_domain(self, hostname):
+        for dom in self.remove_domains:
+            dom = "." + dom.lstrip(".").rstrip(".")
+            if hostname.endswith(dom):
+                return hostname[:-len(dom)]
+
+        return hostname
+
+    def _get_device_links(self, hostname, importer, neighbours=None):
+        """
+        Resolve the netbox interfaces of each neighbour link of a device
+
+        :return (links, unresolved, errors): [(netif_a, netif_b), ...], the
+            ids of the local interfaces whose neighbour could not be resolved,
+            and the number of those neighbours
+        """
+        if neighbours is None:
+            with importer:
+                neighbours = list(importer.get_neighbours())
+
+        links = []
+        unresolved = set()
+        errors = 0
+        for interco in neighbours:
+            try:
+                links.append(self._resolve_link(hostname, interco))
+            except Exception as e:
+                errors += 1
+                logger.warning("Switch %s Error with interco %s: %s",
+                               hostname, interco, e)
+                try:
+                    unresolved.add(self._get_netif_or_derivative(
+                        hostname, interco["local_port"]
+                    ).id)
+                except Exception:
+                    pass
+
+        return links, unresolved, errors
+
+    @generic_netbox_error
+    def _resolve_link(self, hostname, interco):
+        netif_a = self._get_netif_or_derivative(
+            hostname, interco["local_port"]
+        )
+        try:
+            netif_b = self._get_netif_or_derivative(
+                self._remove_domain(interco["hostname"]), interco["port"]
+            )
+        except DeviceNotFoundError:
+            if "chassis_id" not in interco:
+                raise
+
+            netif_b = self._find_netbox_netif_from_lldp_id(
+                interco["chassis_id"], interco["port"]
+            )
+
+        return netif_a, netif_b
+
+    def _reconcile_cables(self, links, polled_hostnames, overwrite, result,
+                          kept_netifs_ids=()):
+        """
+        Apply the minimal cable changes for netbox to match the links
+
+        Links are deduplicated, and an interface found in multiple links only
+        keeps the one with the lowest interfaces ids, so the result does not
+        depend on the order the devices were handled. Cables of the devices
+        are fetched in bulk, then deleted, updated and created with one bulk
+        request each.
+
+        :param polled_hostnames: devices whose neighbours were fetched, their
+                                 unmatched cables being deleted if overwrite
+        :param kept_netifs_ids: ids of interfaces reporting a neighbour that
+                                could not be resolved, whose cable is kept
+        """
+        kept_netifs_ids = set(kept_netifs_ids)
+        wanted_links = {}
+        for netif_a, netif_b in links:
+            if netif_a.id != netif_b.id:
+                key = tuple(sorted((netif_a.id, netif_b.id)))
+                wanted_links.setdefault(key, (netif_a, netif_b))
+
+        linked_netifs = {}
+        for key in sorted(wanted_links):
+            conflicting_key = linked_netifs.get(key[0], linked_netifs.get(
+                key[1]
+            ))
+            if conflicting_key:
+                logger.warning(
+                    "Interfaces %s found in multiple links, ignore link %s",
+                    conflicting_key, key
+                )
+                result["errors_interco"] += 1
+                kept_netifs_ids.update(key)
+                del wanted_links[key]
+                continue
+
+            linked_netifs[key[0]] = linked_netifs[key[1]] = key
+
+        polled_netifs_ids = set()
+        devices_ids = set()
+        for hostname in polled_hostnames:
+            try:
+                interfaces = self._get_interfaces_for_device(hostname)
+            except DeviceNotFoundError as e:
+                logger.warning(
+                    "Cannot reconcile cables of %s: %s", hostname, e
+                )
+                result["errors_device"] += 1
+                continue
+
+            for netif in interfaces.values():
+                polled_netifs_ids.add(netif.id)
+                devices_ids.add(netif.device_id)
+        for netif_a, netif_b in wanted_links.values():
+            devices_ids.update((netif_a.device_id, netif_b.device_id))
+
+        cables_by_netif = self._get_cables_by_netif(devices_ids)
+
+        claimed_cables = set()
+        cables_to_delete = {}
+        cables_to_update = []
+        cables_to_create = []
+        for key, (netif_a, netif_b) in sorted(wanted_links.items()):
+            result["done"] += 1
+            props = {
+                "termination_a_type": "dcim.interface",
+                "termination_a_id": netif_a.id,
+                "termination_b_type": "dcim.interface",
+                "termination_b_id": netif_b.id,
+            }
+
+            cables = [
+                c for c in (
+                    cables_by_netif.get(netif_a.id),
+                    cables_by_netif.get(netif_b.id)
+                ) if c is not None and c.id not in claimed_cables
+            ]
+            if len(cables) == 2 and cables[0].id == cables[1].id:
+                claimed_cables.add(cables[0].id)
+                self._count("skipped")
+                continue
+
+            for cable in cables:
+                claimed_cables.add(cable.id)
+            if cables:
+                # reuse the first cable, delete the other one
+                cables_to_update.append(dict(props, id=cables[0].id))
+                for cable in cables[1:]:
+                    cables_to_delete[cable.id] = {"id": cable.id}
+            else:
+                cables_to_create.append(dict(props, connection_status=True))
+
+        if overwrite:
+            # interfaces reporting an unresolved neighbour keep their cable,
+            # the neighbour may only be missing in netbox
+            for netif_id in polled_netifs_ids - kept_netifs_ids:
+                cable = cables_by_netif.get(netif_id)
+                if cable is not None and cable.id not in claimed_cables:
+                    cables_to_delete[cable.id] = {"id": cable.id}
+
+        if cables_to_delete:
+            self._bulk_request(
+                "dcim", "cables", "delete", list(cables_to_delete.values())
+            )
+        if cables_to_update:
+            self._bulk_request("dcim", "cables", "patch", cables_to_update)
+        if cables_to_create:
+            self._bulk_request("dcim", "cables", "post", cables_to_create)
+
+    @generic_netbox_error
+    def _get_cables_by_netif(self, devices_ids):
+        """
+        :return cables_by_netif: {interface_id: cable} of all cables
+                                 connected to an interface of the devices
+        """
+        cables_by_netif = {}
+        devices_ids = sorted(devices_ids)
+        batch_size = self.cables_lookup_batch_size
+        for i in range(0, len(devices_ids), batch_size):
+            cables = self._iter_mappers(
+                "cables", self.bulk_page_size,
+                device_id=devices_ids[i:i + batch_size]
+            )
+            for cable in cables:
+                for side in ("a", "b"):
+                    termination_type = getattr(
+                        cable, "termination_{}_type".format(side)
+                    )
+                    if termination_type == "dcim.interface":
+                        cables_by_netif[getattr(
+                            cable, "termination_{}_id".format(side)
+                        )] = cable
+
+        return cables_by_netif
 
     def _find_netbox_netif_from_lldp_id(self, lldp_id, if_name):
         """
@@ -444,6 +1396,7 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
         netif_connection = None
         if netif_b.connected_endpoint:
             if netif_b.connected_endpoint.id == netif_a.id:
+                self._count("skipped")
                 return next(self._mappers["cables"].get(
                     netif_b.connected_endpoint.cable.id
                 ))
@@ -458,14 +1411,15 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
             netif_connection = self._get_current_cable_co_of_netif(netif_a)
 
         if netif_connection:
-            for k, v in props.items():
-                setattr(netif_connection, k, v)
-
-            netif_connection.put()
+            # connection_status is not a field of the cable itself
+            self._push_changes(netif_connection, {
+                k: v for k, v in props.items() if k != "connection_status"
+            })
         else:
             netif_connection = self._mappers["cables"].post(
                 **props
             )
+            self._count("written")
 
         return netif_connection
 
@@ -510,69 +1464,60 @@ class NetboxInterconnectionsPusher(_NetboxPusher):
             return interfaces[netif]
 
         if is_macaddr(netif):
-            mac_addresses = defaultdict(list)
-            for i in interfaces:
-                mac_addresses[macaddr_to_int(interfaces[i].mac_address)].append(interfaces[i])
-
-            int_netif_mac = macaddr_to_int(netif)
-            if len(mac_addresses.get(int_netif_mac, 0)) == 1:
-                return mac_addresses[int_netif_mac][0]
+            matching_interfaces = interfaces.get_by_mac(netif)
+            if len(matching_interfaces) == 1:
+                return matching_interfaces[0]
         else:
-            for netif_deriv in self._get_all_derivatives_for_netif(netif):
-                for k in interfaces:
-                    for i in self._get_all_derivatives_for_netif(k):
-                        if i == netif_deriv:
-                            return interfaces[k]
+            interface = interfaces.get_by_derivative(netif)
+            if interface is not None:
+                return interface
 
         raise ValueError(
             "Interface {} not found".format(netif)
         )
 
     def _get_interfaces_for_device(self, hostname):
+        """
+        :return interfaces: IndexedInterfaces of the device, as
+                            InterfaceRecord
+        """
         interfaces = self.interfaces_cache.get(hostname)
         if interfaces is not None:
             return interfaces
 
-        try:
-            device = next(self._mappers["devices"].get(name=hostname))
-        except StopIteration:
-            raise DeviceNotFoundError(hostname)
-
-        interfaces = {
+        device = self._get_device(hostname)
+        interfaces = InterfacesCache.to_records({
             netif.name: netif
             for netif in self._mappers["interfaces"].get(device_id=device.id)
-        }
+        })
         self.interfaces_cache[hostname] = interfaces
 
         return interfaces
 
-    def _get_all_derivatives_for_netif(self, netif):
-        yield netif
-        yield CiscoParser.get_abrev_if(netif)
-        yield JuniperParser.get_real_ifname(netif)
-
     def _update_discovered_from_netif_connection(self, discovered, netif_conn):
         """
-        Update the discovered dict with the correct netif names
+        Update the discovered links with the correct netif names
 
         Names received during the discovery are not always the ones really
         connected in netbox (thanks to the guessing algorithms). Add in
-        the `discovered` dict with the correct ones.
+        the `discovered` LinksRegistry the link with the correct ones.
         """
         netif_a = netif_conn.termination_a
         hostname_a = netif_a.device.name
         netif_b = netif_conn.termination_b
         hostname_b = netif_b.device.name
 
-        discovered[hostname_a][netif_a.name] = (hostname_b, netif_b.name)
-        discovered[hostname_b][netif_b.name] = (hostname_a, netif_a.name)
+        discovered.add((hostname_a, netif_a.name), (hostname_b, netif_b.name))
         return discovered
 
     @generic_netbox_error
     def _clean_undetected_intercos(self, hostname, discovered):
         for netif in self._get_interfaces_for_device(hostname).values():
-            if netif.name not in discovered[hostname]:
+            # interfaces connected during this run are all discovered
+            undetected = not discovered.is_discovered(hostname, netif.name)
+            if undetected and netif.cable_id:
                 try:
-                    self._delete_connection_to_netbox_netif(netif)
+                    with self._lock_netifs_and_peers(netif) as netifs:
+                        self._delete_connection_to_netbox_netif(netifs[0])
                 except ValueError:
                     pass
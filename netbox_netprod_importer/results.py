@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import appdirs
+
+from netbox_netprod_importer import __appname__
+
+
+DEFAULT_PATH = os.path.join(
+    appdirs.user_cache_dir(__appname__), "poll_results.sqlite"
+)
+
+
+def get_props_hashes(props, **options):
+    """
+    Hash polled properties, to detect what changed since the last push
+
+    Only the polled properties are hashed, not how they resolve in Netbox
+    (vlans, ip addresses): objects created or fixed in Netbox since the last
+    push are not detected.
+
+    :param props: polled properties, as returned by `DeviceImporter.poll()`.
+                  Neighbours are ignored
+    :param options: push options changing what is pushed from the same
+                    properties (like overwrite), added to each hash
+    :return (device_hash, {interface_name: interface_hash}):
+    """
+    device_props = {k: v for k, v in props.items() if k != "neighbours"}
+    device_hash = _hash({"props": device_props, "options": options})
+    interfaces_hashes = {
+        if_name: _hash({"props": if_prop, "options": options})
+        for if_name, if_prop in props.get("interfaces", {}).items()
+    }
+
+    return device_hash, interfaces_hashes
+
+
+def _hash(value):
+    dump = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(dump.encode()).hexdigest()
+
+
+class PollResultsStore():
+    """
+    SQLite store of the last successfully pushed poll results of each device
+
+    For each hostname, keep the hash of the pushed properties and the hash of
+    each interface. Can be shared between threads.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        :param path: sqlite database path, created if missing
+        """
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS devices (
+                    hostname TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS interfaces (
+                    hostname TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (hostname, name)
+                );
+            """)
+
+    def get_hashes(self, hostname):
+        """
+        :return (device_hash, {interface_name: interface_hash}): hashes of the
+            last pushed results, (None, {}) if the device was never pushed
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM devices WHERE hostname = ?", (hostname,)
+            ).fetchone()
+            interfaces_rows = self._conn.execute(
+                "SELECT name, hash FROM interfaces WHERE hostname = ?",
+                (hostname,)
+            ).fetchall()
+
+        return (row[0] if row else None), dict(interfaces_rows)
+
+    def save(self, hostname, device_hash, interfaces_hashes):
+        """
+        Replace the results of a device, once successfully pushed
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO devices (hostname, hash) "
+                "VALUES (?, ?)", (hostname, device_hash)
+            )
+            self._conn.execute(
+                "DELETE FROM interfaces WHERE hostname = ?", (hostname,)
+            )
+            self._conn.executemany(
+                "INSERT INTO interfaces (hostname, name, hash) "
+                "VALUES (?, ?, ?)",
+                ((hostname, if_name, if_hash)
+                 for if_name, if_hash in interfaces_hashes.items())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,93 @@
+from contextlib import ContextDecorator
+import gzip
+import json
+import os
+from urllib.parse import quote, unquote
+
+
+SNAPSHOT_EXT = ".json.gz"
+
+
+def save_snapshot(save_dir, hostname, importer, props):
+    """
+    Save the polled data of a device in save_dir
+
+    :param importer: DeviceImporter the device was polled with
+    :param props: polled properties, as returned by `DeviceImporter.poll()`,
+                  with the neighbours list in props["neighbours"] (None if it
+                  could not be fetched)
+    """
+    snapshot = {
+        "hostname": hostname,
+        "target": importer.hostname,
+        "driver": importer.napalm_driver_name,
+        "props": {k: v for k, v in props.items() if k != "neighbours"},
+        "neighbours": props.get("neighbours"),
+    }
+
+    path = os.path.join(save_dir, quote(hostname, safe="") + SNAPSHOT_EXT)
+    with gzip.open(path + ".tmp", "wt") as snapshot_file:
+        json.dump(snapshot, snapshot_file, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def iter_snapshots(snapshots_dir):
+    """
+    :return importers: iterator of (hostname, SnapshotImporter) for each
+                       device saved in snapshots_dir
+    """
+    for filename in sorted(os.listdir(snapshots_dir)):
+        if filename.endswith(SNAPSHOT_EXT):
+            hostname = unquote(filename[:-len(SNAPSHOT_EXT)])
+            yield hostname, SnapshotImporter(
+                os.path.join(snapshots_dir, filename), hostname
+            )
+
+
+class SnapshotImporter(ContextDecorator):
+    """
+    Replay a saved snapshot with the DeviceImporter interface
+
+    The snapshot is only read when the importer is opened, and released when
+    closed.
+    """
+
+    def __init__(self, path, hostname):
+        self.path = path
+        self.hostname = hostname
+        self.napalm_driver_name = None
+        self._snapshot = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        with gzip.open(self.path, "rt") as snapshot_file:
+            self._snapshot = json.load(snapshot_file)
+
+        self.hostname = self._snapshot["target"]
+        self.napalm_driver_name = self._snapshot["driver"]
+
+    def close(self):
+        self._snapshot = None
+
+    def prefetch(self, with_neighbours=False):
+        pass
+
+    def poll(self):
+        assert self._snapshot
+
+        return self._snapshot["props"]
+
+    def get_neighbours(self):
+        assert self._snapshot
+
+        if self._snapshot["neighbours"] is None:
+            raise ValueError(
+                "Neighbours of {} were not fetched".format(self.hostname)
+            )
+
+        return iter(self._snapshot["neighbours"])
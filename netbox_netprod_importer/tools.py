@@ -1,3 +1,7 @@
+from contextlib import contextmanager
+import threading
+
+from netboxapi import NetboxMapper
 from requests.exceptions import HTTPError
 
 from netbox_netprod_importer.exceptions import GenericNetboxError
@@ -23,6 +27,54 @@ def macaddr_to_int(macaddr):
     return int(macaddr_simplified, 16)
 
 
+def get_netbox_obj_changes(netbox_obj, wanted_props):
+    """
+    Compare wanted properties with the ones of a netbox object
+
+    Values are normalized before being compared, so a choice, a nested object
+    or a mapper is equal to its value or id, a list of VLAN is compared
+    without order, MAC addresses are compared whatever their format and
+    empty values are all considered the same.
+
+    :return changes: {field: value}, items of wanted_props differing from
+                     netbox_obj
+    """
+    current_props = netbox_obj.to_dict()
+    return {
+        k: v for k, v in wanted_props.items()
+        if (
+            _normalize_netbox_value(k, current_props.get(k)) !=
+            _normalize_netbox_value(k, v)
+        )
+    }
+
+
+def _normalize_netbox_value(field, value):
+    if isinstance(value, NetboxMapper):
+        value = getattr(value, "id", None)
+    elif isinstance(value, dict):
+        if "value" in value and "label" in value:
+            value = value["value"]
+        elif "id" in value:
+            value = value["id"]
+    elif isinstance(value, (list, tuple, set)):
+        return sorted(
+            (_normalize_netbox_value(field, v) for v in value), key=str
+        )
+
+    if field == "mac_address":
+        return macaddr_to_int(value)
+    elif field == "mtu":
+        try:
+            return int(value) or None
+        except (ValueError, TypeError):
+            return None
+
+    if value == "":
+        return None
+    return value
+
+
 def generic_netbox_error(func):
     """
     Convert an HTTP error to a more explicit exception
@@ -33,3 +85,47 @@ def generic_netbox_error(func):
         except HTTPError as e:
             raise GenericNetboxError(e)
     return wrapper
+
+
+class KeyedLocks():
+    """
+    Locks identified by a key, created on demand and dropped once released
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        #: {key: [lock, number of threads using it]}
+        self._locks = {}
+
+    @contextmanager
+    def acquire(self, *keys):
+        """
+        Hold the locks of all keys
+
+        Locks are always acquired in the same order, so threads asking for
+        overlapping keys cannot deadlock.
+        """
+        keys = sorted(set(keys))
+        with self._lock:
+            locks = []
+            for key in keys:
+                entry = self._locks.setdefault(key, [threading.Lock(), 0])
+                entry[1] += 1
+                locks.append(entry[0])
+
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+            with self._lock:
+                for key in keys:
+                    entry = self._locks[key]
+                    entry[1] -= 1
+                    if not entry[1]:
+                        del self._locks[key]
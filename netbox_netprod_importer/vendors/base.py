@@ -1,14 +1,32 @@
 from abc import ABC, abstractmethod
 import logging
 
+from netbox_netprod_importer.cache import ParserCache
+
 
 logger = logging.getLogger("netbox_importer")
 
 
 class _AbstractVendorParser(ABC):
 
-    def __init__(self, napalm_device, *args, **kwargs):
+    def __init__(self, napalm_device, *args, cache=None, **kwargs):
+        """
+        :param cache: ParserCache shared with other parsers, a private one
+                      living as long as this parser if None
+        """
         self.device = napalm_device
+        if cache is None:
+            cache = ParserCache()
+        self.cache = cache.for_device(napalm_device.hostname)
+
+    def prefetch(self, neighbours_protocols=()):
+        """
+        Fetch in advance, in as few requests as possible, what a poll needs
+
+        :param neighbours_protocols: discovery protocols ("lldp", "cdp")
+            whose neighbours will also be fetched
+        """
+        pass
 
     @abstractmethod
     def get_interfaces_lag(self, interfaces):
@@ -1,14 +1,13 @@
-import cachetools
 import re
 
 from netbox_netprod_importer.vendors import _AbstractVendorParser
+from netbox_netprod_importer.vendors.classifier import InterfaceTypeClassifier
+from .constants import InterfacesRegex
 
 
 class CiscoParser(_AbstractVendorParser):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        self.cache = cachetools.TTLCache(128, 600)
+    #: shared by all cisco parsers
+    interface_type_classifier = InterfaceTypeClassifier(InterfacesRegex)
 
     @staticmethod
     def get_abrev_if(interface):
@@ -23,15 +22,14 @@ class CiscoParser(_AbstractVendorParser):
         return prefix + if_index_re
 
     def get_interface_vlans(self, interface):
-
-        if not self.cache.get("vlan"):
-            self.cache["ttl"] = 600
-            self.cache["vlan"] = {}
+        vlans_by_if = self.cache.get("vlans", "vlans_by_if")
+        if vlans_by_if is None:
+            vlans_by_if = {}
             for vlan, data in self.get_vlans():
                 for iface in data["interfaces"]:
-                    if not self.cache["vlan"].get(iface):
-                        self.cache["vlan"][iface] = []
-                    self.cache["vlan"][iface].append(vlan)
-        return self.cache["vlan"].get(interface)
+                    vlans_by_if.setdefault(iface, []).append(vlan)
+            self.cache.set("vlans", "vlans_by_if", vlans_by_if)
+
+        return vlans_by_if.get(interface)
 
 
@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+logger = logging.getLogger("netbox_importer")
+
+
+class JSONDecoder():
+    """
+    Decoder of NX-OS structured outputs, based on the json module
+
+    NX-OS outputs are documents of TABLE_*/ROW_* subtrees, a table containing
+    a single row dict or a list of rows. Decoders extract the rows of one
+    table, keeping only the fields asked.
+
+    Only the table subtree is decoded when the table is found at the first
+    level of the document.
+    """
+    name = "json"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+
+    def get_rows(self, output, table, row, fields=None):
+        """
+        :param output: JSON document, as a str
+        :param table: name of the TABLE_* at the first level of the document
+        :param row: name of the ROW_* in table
+        :param fields: fields to keep in each row, all if None
+        :return rows: list of rows
+        :raises KeyError: if table or row is missing
+        :raises json.JSONDecodeError: if the document cannot be decoded
+        """
+        return _filter_rows(self.get_table(output, table)[row], fields)
+
+    def get_table(self, output, table):
+        pos = self._find_first_level_key(output, table)
+        if pos is None:
+            return self.loads(output)[table]
+
+        value_pos = pos + len(table) + 2
+        while output[value_pos] in " \t\r\n:":
+            value_pos += 1
+
+        return self._decoder.raw_decode(output, value_pos)[0]
+
+    def loads(self, output):
+        return json.loads(output)
+
+    @staticmethod
+    def _find_first_level_key(output, key):
+        """
+        :return pos: position of the key in output, None if not found or not
+                     sure to be at the first level
+        """
+        pos = output.find('"{}"'.format(key))
+        if pos < 0:
+            return None
+
+        # braces in strings before the key would fool this check, the whole
+        # document being then decoded
+        depth = output.count("{", 0, pos) - output.count("}", 0, pos)
+        brackets = output.count("[", 0, pos) - output.count("]", 0, pos)
+        if depth != 1 or brackets:
+            return None
+
+        return pos
+
+
+class ORJSONDecoder(JSONDecoder):
+    """
+    Decoder based on orjson
+
+    orjson cannot decode a subtree, so the whole document is decoded, still
+    faster than only the table with json but with a higher memory peak.
+    """
+    name = "orjson"
+
+    def get_table(self, output, table):
+        return self.loads(output)[table]
+
+    def loads(self, output):
+        return orjson.loads(output)
+
+
+class SIMDJSONDecoder(JSONDecoder):
+    """
+    Decoder based on simdjson, only materializing the fields asked from the
+    rows of the table
+    """
+    name = "simdjson"
+
+    def __init__(self):
+        super().__init__()
+        # a parser is not thread-safe, and invalidates its previous document
+        # on each parse
+        self._local = threading.local()
+
+    @property
+    def _parser(self):
+        if not hasattr(self._local, "parser"):
+            self._local.parser = simdjson.Parser()
+
+        return self._local.parser
+
+    def get_rows(self, output, table, row, fields=None):
+        try:
+            rows = self._parser.parse(output)[table][row]
+        except ValueError as e:
+            raise json.JSONDecodeError(str(e), output, 0) from e
+
+        if isinstance(rows, simdjson.Object):
+            rows = [rows]
+
+        if fields is None:
+            return [r.as_dict() for r in rows]
+
+        filtered_rows = []
+        for r in rows:
+            filtered_row = {}
+            for field in fields:
+                try:
+                    filtered_row[field] = _materialize(r[field])
+                except KeyError:
+                    pass
+            filtered_rows.append(filtered_row)
+
+        return filtered_rows
+
+    def loads(self, output):
+        try:
+            return _materialize(self._parser.parse(output))
+        except ValueError as e:
+            raise json.JSONDecodeError(str(e), output, 0) from e
+
+
+def _materialize(value):
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    elif isinstance(value, simdjson.Array):
+        return value.as_list()
+
+    return value
+
+
+def _filter_rows(rows, fields=None):
+    if isinstance(rows, dict):
+        rows = [rows]
+
+    if fields is None:
+        return rows
+
+    return [{f: r[f] for f in fields if f in r} for r in rows]
+
+
+#: {name: decoder class}, of the decoders whose library is installed, from
+#: the fastest to the slowest as measured by tools/bench_nxos_json.py
+json_decoders = {}
+if simdjson is not None:
+    json_decoders["simdjson"] = SIMDJSONDecoder
+if orjson is not None:
+    json_decoders["orjson"] = ORJSONDecoder
+json_decoders["json"] = JSONDecoder
+
+
+def get_json_decoder(name=None):
+    """
+    :param name: name of the decoder to use, the fastest one installed if
+                 None
+    :return decoder:
+    """
+    if name is None:
+        name = next(iter(json_decoders))
+    elif name not in json_decoders:
+        raise ValueError("JSON decoder {} not available".format(name))
+
+    logger.debug("Using the %s decoder for NX-OS outputs", name)
+    return json_decoders[name]()
+
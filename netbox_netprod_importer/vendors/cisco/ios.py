@@ -3,8 +3,6 @@ import logging
 from collections import defaultdict
 
 from netbox_netprod_importer.exceptions import TypeCouldNotBeParsedError
-from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
-from .constants import InterfacesRegex
 from .base import CiscoParser
 
 
@@ -15,10 +13,20 @@ class IOSParser(CiscoParser):
     def get_interfaces_lag(self, interfaces):
         super().get_interfaces_lag(interfaces)
 
+        interfaces_conf = self._get_interfaces_conf_from_running_config()
+        if not interfaces_conf:
+            logger.debug(
+                "Switch %s, no interface in running config, fetch each "
+                "interface configuration", self.device.hostname
+            )
+
         interfaces_lag = defaultdict(list)
         for interface in sorted(interfaces):
-            cmd = "show run interface {}".format(interface)
-            interface_conf_dump = self.device.cli([cmd])[cmd]
+            if interfaces_conf:
+                interface_conf_dump = interfaces_conf.get(interface, "")
+            else:
+                cmd = "show run interface {}".format(interface)
+                interface_conf_dump = self.device.cli([cmd])[cmd]
 
             channel_group_match = re.search(
                 r"^\s*channel-group (\S*)", interface_conf_dump, re.MULTILINE
@@ -34,6 +42,47 @@ class IOSParser(CiscoParser):
 
         return interfaces_lag
 
+    def _get_interfaces_conf_from_running_config(self):
+        """
+        Split the running config in one section per interface
+
+        :return interfaces_conf: {interface_name: interface_conf_dump}, empty
+                                 if the running config could not be fetched
+                                 or parsed
+        """
+        cmd = "show running-config"
+
+        interfaces_conf_by_if = self.cache.get("config", "interfaces_conf")
+        if interfaces_conf_by_if is None:
+            try:
+                run_conf_dump = self.device.cli([cmd])[cmd]
+            except Exception as e:
+                logger.debug(
+                    "Switch %s, cannot fetch running config: %s",
+                    self.device.hostname, e
+                )
+                return {}
+
+            interfaces_conf = {}
+            interface = None
+            for l in run_conf_dump.splitlines():
+                interface_match = re.match(r"^interface (\S+)", l)
+                if interface_match:
+                    interface = interface_match.groups()[0]
+                    interfaces_conf[interface] = []
+                elif interface and l.startswith(" "):
+                    interfaces_conf[interface].append(l)
+                else:
+                    interface = None
+
+            interfaces_conf_by_if = {
+                interface: "\n".join(conf_lines)
+                for interface, conf_lines in interfaces_conf.items()
+            }
+            self.cache.set("config", "interfaces_conf", interfaces_conf_by_if)
+
+        return interfaces_conf_by_if
+
     def get_interface_type(self, interface):
         super().get_interface_type(interface)
         if re.search(r"^Vlan(\d*)|^Tunnel(\d+)", interface):
@@ -42,13 +91,10 @@ class IOSParser(CiscoParser):
         interface_type = "Other"
         try:
             cisco_if_type = self._guess_type_from_if_type(interface)
-
-            for pattern_iftype in InterfacesRegex:
-                pattern = pattern_iftype.value
-                if re.match(pattern, cisco_if_type):
-                    return getattr(
-                        NetboxInterfaceTypes, pattern_iftype.name
-                    ).value
+            if cisco_if_type:
+                return self.interface_type_classifier.classify(
+                    cisco_if_type
+                ) or interface_type
         except TypeCouldNotBeParsedError:
             pass
 
@@ -66,9 +112,10 @@ class IOSParser(CiscoParser):
     def _get_ifstatus_by_abrev_if(self):
         cmd = "show interface status"
 
-        if not self.cache.get("ifstatus"):
+        ifstatus_by_abrev_if = self.cache.get("interfaces", "ifstatus")
+        if ifstatus_by_abrev_if is None:
             status_conf_dump = self.device.cli([cmd])[cmd].strip()
-            self.cache["ifstatus"] = {}
+            ifstatus_by_abrev_if = {}
             start = status_conf_dump.find('Type')
             for l in status_conf_dump.splitlines()[1:]:
                 split_l = l.split(maxsplit=1)
@@ -78,9 +125,10 @@ class IOSParser(CiscoParser):
                 except:
                     if_type = None
 
-                self.cache["ifstatus"][if_abrev] = if_type
+                ifstatus_by_abrev_if[if_abrev] = if_type
+            self.cache.set("interfaces", "ifstatus", ifstatus_by_abrev_if)
 
-        return self.cache["ifstatus"]
+        return ifstatus_by_abrev_if
 
     def get_detailed_cdp_neighbours(self):
         cmd = "show cdp neighbors detail"
@@ -141,7 +189,8 @@ class IOSParser(CiscoParser):
     def _get_interfaces_mode(self):
         cmd = "show interface switchport"
 
-        if not self.cache.get("mode"):
+        interfaces_mode = self.cache.get("interfaces", "mode")
+        if interfaces_mode is None:
             mode_conf_dump = self.device.cli([cmd])[cmd]
             mode_conf_lines = re.split(r"(^Name: \S+$)", mode_conf_dump, flags=re.M)
             mode_conf_lines.pop(0)
@@ -171,9 +220,9 @@ class IOSParser(CiscoParser):
                 if inf_mode.get("interface"):
                     interfaces_mode[inf_mode["interface"]] = inf_mode
 
-            self.cache["mode"] = interfaces_mode
+            self.cache.set("interfaces", "mode", interfaces_mode)
 
-        return self.cache["mode"]
+        return interfaces_mode
 
     def get_vlans(self):
         """
@@ -4,15 +4,79 @@ import logging
 
 from netbox_netprod_importer.exceptions import TypeCouldNotBeParsedError
 from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
-from .constants import InterfacesRegex
 from .base import CiscoParser
+from .decoders import get_json_decoder
 from napalm.nxos.nxos import NXOSDriver
 from collections import defaultdict
 
 logger = logging.getLogger("netbox_importer")
 
+#: warning printed by some NX-OS versions before the JSON output
+_OUTPUT_PREFIX_RE = re.compile(r"^.+\. {")
+
 
 class NXOSParser(CiscoParser):
+    #: decoder of the structured outputs, shared by all NX-OS parsers
+    json_decoder = get_json_decoder()
+    #: commands run when polling the interfaces of a device
+    poll_commands = (
+        "show interface transceiver", "show interface status",
+        "show interface switchport", "show port-channel summary",
+        "show vlan brief",
+    )
+    #: {discovery protocol: command run to get the neighbours}
+    neighbours_commands = {
+        "lldp": "show lldp neighbors detail",
+        "cdp": "show cdp neighbors detail",
+    }
+
+    def prefetch(self, neighbours_protocols=()):
+        """
+        Run all commands needed by a poll in one batch, and cache their
+        outputs
+
+        If the batch fails, nothing is cached and each command is run when
+        needed, to handle its errors separately.
+        """
+        end_selection = self._driver_end_selection()
+        cmds = [
+            cmd + end_selection for cmd in self.poll_commands + tuple(
+                self.neighbours_commands[p] for p in neighbours_protocols
+            )
+        ]
+
+        try:
+            outputs = self._cli_batch(cmds)
+        except Exception as e:
+            logger.debug(
+                "Switch %s, prefetch failed, run each command: %s",
+                self.device.hostname, e
+            )
+            return
+
+        for cmd, output in outputs.items():
+            self.cache.set("cli", cmd, output)
+
+    def _cli_batch(self, cmds):
+        if type(self.device) is NXOSDriver:
+            # napalm sends one NX-API request per command, send them all in
+            # the same request
+            results = self.device.device.show_list(cmds, raw_text=True)
+            return {
+                cmd: result["result"]
+                for cmd, result in zip(cmds, results)
+            }
+        else:
+            return self.device.cli(cmds)
+
+    def _cli(self, cmd):
+        """
+        :return output: output of cmd, cached or run on the device
+        """
+        return self.cache.get_or_fetch(
+            "cli", cmd, lambda: self.device.cli([cmd])[cmd]
+        )
+
     def get_interface_type(self, interface):
         super().get_interface_type(interface)
         if re.search(r"^Vlan(\d*)|^Tunnel(\d+)", interface):
@@ -41,26 +105,27 @@ class NXOSParser(CiscoParser):
             logger.debug("%s has no transceiver detail", interface)
             raise TypeCouldNotBeParsedError()
 
-        for pattern_iftype in InterfacesRegex:
-            pattern = pattern_iftype.value
-            if re.match(pattern, part_num):
-                return getattr(NetboxInterfaceTypes, pattern_iftype.name).value
+        interface_type = self.interface_type_classifier.classify(part_num)
+        if interface_type:
+            return interface_type
 
         raise TypeCouldNotBeParsedError()
 
     def _get_transceiver_by_if(self):
         cmd = "show interface transceiver" + self._driver_end_selection()
 
-        if not self.cache.get("transceivers"):
-            transceiver_conf_dump = self.device.cli([cmd])[cmd]
-            transceivers = self._correct_and_convert_to_dict(
-                transceiver_conf_dump)["TABLE_interface"]["ROW_interface"]
+        transceivers_by_if = self.cache.get("interfaces", "transceivers")
+        if transceivers_by_if is None:
+            transceiver_conf_dump = self._cli(cmd)
+            transceivers = self._get_table_rows(
+                transceiver_conf_dump, "TABLE_interface", "ROW_interface",
+                fields=("interface", "partnum")
+            )
 
-            self.cache["transceivers"] = {
-                i["interface"]: i for i in transceivers
-            }
+            transceivers_by_if = {i["interface"]: i for i in transceivers}
+            self.cache.set("interfaces", "transceivers", transceivers_by_if)
 
-        return self.cache["transceivers"]
+        return transceivers_by_if
 
     def _guess_type_from_if_type(self, interface):
         from pynxos.errors import CLIError
@@ -78,25 +143,27 @@ class NXOSParser(CiscoParser):
             except ValueError:
                 pass
         else:
-            for pattern in InterfacesRegex:
-                if re.match(pattern.value, if_type):
-                    return getattr(NetboxInterfaceTypes, pattern.name).value
+            interface_type = self.interface_type_classifier.classify(if_type)
+            if interface_type:
+                return interface_type
 
         raise TypeCouldNotBeParsedError()
 
     def _get_ifstatus_by_if(self):
         cmd = "show interface status" + self._driver_end_selection()
 
-        if not self.cache.get("ifstatus"):
-            status_conf_dump = self.device.cli([cmd])[cmd]
-            status = self._correct_and_convert_to_dict(status_conf_dump)[
-                "TABLE_interface"]["ROW_interface"]
+        ifstatus_by_if = self.cache.get("interfaces", "ifstatus")
+        if ifstatus_by_if is None:
+            status_conf_dump = self._cli(cmd)
+            status = self._get_table_rows(
+                status_conf_dump, "TABLE_interface", "ROW_interface",
+                fields=("interface", "speed", "type")
+            )
 
-            self.cache["ifstatus"] = {
-                i["interface"]: i for i in status
-            }
+            ifstatus_by_if = {i["interface"]: i for i in status}
+            self.cache.set("interfaces", "ifstatus", ifstatus_by_if)
 
-        return self.cache["ifstatus"]
+        return ifstatus_by_if
 
     def get_detailed_lldp_neighbours(self):
         """
@@ -111,12 +178,11 @@ class NXOSParser(CiscoParser):
         """
         cmd = "show lldp neighbors detail" + self._driver_end_selection()
 
-        cmd_output = self.device.cli([cmd])[cmd]
-        neighbours = self._correct_and_convert_to_dict(cmd_output)[
-            "TABLE_nbor_detail"]["ROW_nbor_detail"]
-
-        if isinstance(neighbours, dict):
-            neighbours = [neighbours]
+        cmd_output = self._cli(cmd)
+        neighbours = self._get_table_rows(
+            cmd_output, "TABLE_nbor_detail", "ROW_nbor_detail",
+            fields=("l_port_id", "sys_name", "port_id", "chassis_id")
+        )
 
         for n in neighbours:
             yield {
@@ -138,12 +204,12 @@ class NXOSParser(CiscoParser):
         """
         cmd = "show cdp neighbors detail" + self._driver_end_selection()
 
-        cmd_output = self.device.cli([cmd])[cmd]
-        neighbours = self._correct_and_convert_to_dict(cmd_output)[
-            "TABLE_cdp_neighbor_detail_info"]["ROW_cdp_neighbor_detail_info"]
-
-        if isinstance(neighbours, dict):
-            neighbours = [neighbours]
+        cmd_output = self._cli(cmd)
+        neighbours = self._get_table_rows(
+            cmd_output, "TABLE_cdp_neighbor_detail_info",
+            "ROW_cdp_neighbor_detail_info",
+            fields=("intf_id", "device_id", "port_id")
+        )
 
         for n in neighbours:
             yield {
@@ -159,23 +225,31 @@ class NXOSParser(CiscoParser):
         else:
             return " | json"
 
-    def _correct_and_convert_to_dict(self, cmd_output) -> dict:
-        if type(cmd_output) is not dict:
-            if not re.search("^{", cmd_output):
-                cmd_output = re.sub('^.+\. {', '{', cmd_output, count=1)
-            cmd_output = json.loads(cmd_output)
-        return cmd_output
+    def _get_table_rows(self, cmd_output, table, row, fields=None) -> list:
+        """
+        :param cmd_output: structured output, as a str or as a dict if
+                           already decoded
+        :param fields: fields to keep in each row, all if None
+        :return rows: list of the rows of table
+        """
+        if type(cmd_output) is dict:
+            rows = cmd_output[table][row]
+            return [rows] if isinstance(rows, dict) else rows
+
+        if not cmd_output.startswith("{"):
+            cmd_output = _OUTPUT_PREFIX_RE.sub("{", cmd_output, count=1)
+
+        return self.json_decoder.get_rows(cmd_output, table, row, fields)
 
     def get_interfaces_lag(self, interfaces):
         cmd = "show port-channel summary" + self._driver_end_selection()
         interfaces_lag = defaultdict(list)
 
-        cmd_output = self.device.cli([cmd])[cmd]
-        port_cannels = self._correct_and_convert_to_dict(cmd_output)[
-            "TABLE_channel"]["ROW_channel"]
-
-        if isinstance(port_cannels, dict):
-            port_cannels = [port_cannels]
+        cmd_output = self._cli(cmd)
+        port_cannels = self._get_table_rows(
+            cmd_output, "TABLE_channel", "ROW_channel",
+            fields=("port-channel", "TABLE_member")
+        )
 
         for p in port_cannels:
             if not p.get("TABLE_member"):
@@ -225,16 +299,18 @@ class NXOSParser(CiscoParser):
     def _get_interfaces_mode(self):
         cmd = "show interface switchport" + self._driver_end_selection()
 
-        if not self.cache.get("mode"):
-            mode_conf_dump = self.device.cli([cmd])[cmd]
-            mode = self._correct_and_convert_to_dict(mode_conf_dump)[
-                "TABLE_interface"]["ROW_interface"]
+        mode_by_if = self.cache.get("interfaces", "mode")
+        if mode_by_if is None:
+            mode_conf_dump = self._cli(cmd)
+            mode = self._get_table_rows(
+                mode_conf_dump, "TABLE_interface", "ROW_interface",
+                fields=("interface", "oper_mode", "access_vlan", "native_vlan")
+            )
 
-            self.cache["mode"] = {
-                i["interface"]: i for i in mode
-            }
+            mode_by_if = {i["interface"]: i for i in mode}
+            self.cache.set("interfaces", "mode", mode_by_if)
 
-        return self.cache["mode"]
+        return mode_by_if
 
     def get_vlans(self):
         """
@@ -249,12 +325,14 @@ class NXOSParser(CiscoParser):
         """
         cmd = "show vlan brief" + self._driver_end_selection()
 
-        cmd_output = self.device.cli([cmd])[cmd]
-        vlans = self._correct_and_convert_to_dict(cmd_output)[
-            "TABLE_vlanbriefxbrief"]["ROW_vlanbriefxbrief"]
-
-        if isinstance(vlans, dict):
-            vlans = [vlans]
+        cmd_output = self._cli(cmd)
+        vlans = self._get_table_rows(
+            cmd_output, "TABLE_vlanbriefxbrief", "ROW_vlanbriefxbrief",
+            fields=(
+                "vlanshowbr-vlanid", "vlanshowbr-vlanname",
+                "vlanshowplist-ifidx"
+            )
+        )
 
         for v in vlans:
             yield v["vlanshowbr-vlanid"], {
@@ -0,0 +1,41 @@
+import functools
+import re
+
+from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
+
+
+class InterfaceTypeClassifier():
+    """
+    Classify interfaces from part numbers or vendor type strings
+
+    All patterns of an InterfacesRegex enum are compiled once in a single
+    alternation, each pattern in a named group. As re.match tries the
+    alternatives in order, the first matching pattern of the enum wins, like
+    when matching them one by one. Results are memoized by type string.
+    """
+
+    def __init__(self, interfaces_regex, cache_size=4096):
+        """
+        :param interfaces_regex: Enum of {netbox interface type name: regex}
+        :param cache_size: max number of type strings memoized
+        """
+        self.interfaces_regex = interfaces_regex
+        self._regex = re.compile("|".join(
+            "(?P<{}>{})".format(pattern_iftype.name, pattern_iftype.value)
+            for pattern_iftype in interfaces_regex
+        ))
+        self.classify = functools.lru_cache(maxsize=cache_size)(
+            self._classify
+        )
+
+    def _classify(self, type_str):
+        """
+        :param type_str: part number or vendor type string
+        :return interface_type: NetboxInterfaceTypes value, None if no
+                                pattern matches
+        """
+        match = self._regex.match(type_str)
+        if not match:
+            return None
+
+        return getattr(NetboxInterfaceTypes, match.lastgroup).value
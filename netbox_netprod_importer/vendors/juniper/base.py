@@ -7,7 +7,7 @@ from jnpr.junos.exception import RpcError
 import re
 
 from netbox_netprod_importer.vendors import _AbstractVendorParser
-from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
+from netbox_netprod_importer.vendors.classifier import InterfaceTypeClassifier
 from netbox_netprod_importer.exceptions import TypeCouldNotBeParsedError
 from .constants import InterfacesRegex
 
@@ -16,10 +16,8 @@ logger = logging.getLogger("netbox_importer")
 
 
 class JuniperParser(_AbstractVendorParser):
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.cache = {}
+    #: shared by all juniper parsers
+    interface_type_classifier = InterfaceTypeClassifier(InterfacesRegex)
 
     def get_interfaces_lag(self, interfaces):
         return super().get_interfaces_lag(interfaces)
@@ -38,6 +36,13 @@ class JuniperParser(_AbstractVendorParser):
 
 class JunOSParser(JuniperParser):
 
+    def prefetch(self, neighbours_protocols=()):
+        """
+        Build the table of the ports part numbers before the interfaces are
+        typed
+        """
+        self._get_pics_part_numbers()
+
     def get_interfaces_lag(self, interfaces):
         interfaces_lag = defaultdict(set)
 
@@ -75,12 +80,10 @@ class JunOSParser(JuniperParser):
         except TypeCouldNotBeParsedError:
             return "Other"
 
-        for pattern_iftype in InterfacesRegex:
-            pattern = pattern_iftype.value
-            if re.match(pattern, junos_type):
-                return getattr(NetboxInterfaceTypes, pattern_iftype.name).value
+        if not junos_type:
+            return "Other"
 
-        return "Other"
+        return self.interface_type_classifier.classify(junos_type) or "Other"
 
     def _guess_type_from_chassis_pic(self, interface):
         pattern = r".*-(\d+)/(\d+)/(\d+)"
@@ -94,33 +97,130 @@ class JunOSParser(JuniperParser):
         if max((fpc, pic, port_index)) > 254:
             return "Other"
 
-        if "pic" not in self.cache:
-            self.cache["pic"] = {}
+        part_numbers = self._get_pics_part_numbers().get((fpc, pic))
+        if part_numbers is None:
+            # missing from the bulk table, fetch this PIC alone
+            part_numbers = self.cache.get_or_fetch(
+                "chassis", ("pic", fpc, pic),
+                lambda: self._get_pic_part_numbers((fpc, pic)) or {}
+            )
 
-        if (fpc, pic) not in self.cache["pic"]:
-            try:
-                chassis_pic_xml = self.device._rpc(
-                    self._gen_rpc_request_pic_info(fpc, pic)
-                )
-            except RpcError as e:
-                logger.debug("RPC error: %s", e)
-                raise TypeCouldNotBeParsedError(interface)
+        for port in (port_index, None):
+            if port in part_numbers:
+                return part_numbers[port]
 
-            parsed_xml = defusedxml.lxml.fromstring(chassis_pic_xml)
-            self.cache["pic"][(fpc, pic)] = parsed_xml
-        else:
-            parsed_xml = self.cache["pic"][(fpc, pic)]
+        raise TypeCouldNotBeParsedError(interface)
 
+    def _get_pics_part_numbers(self):
+        """
+        :return part_numbers: {(fpc, pic): {port: part number}} of the PICs
+            in the chassis inventory, with {None: pic type} for the PICs
+            without port information
+        """
+        return self.cache.get_or_fetch(
+            "chassis", "pics_part_numbers", self._fetch_pics_part_numbers
+        )
+
+    def _fetch_pics_part_numbers(self):
+        """
+        List the PICs of the chassis inventory, then fetch all their details
+        before the interfaces are typed
+
+        RPCs are sent one after another, the PyEZ device session not being
+        safe to share between threads. If the inventory fails, the table is
+        empty and each PIC is fetched when needed.
+        """
         try:
-            ports_info = parsed_xml.findall(".//port-information")[0]
-        except IndexError:
-            return parsed_xml.findall(".//pic-type")[0].text
+            pics = self._get_chassis_pics()
+        except Exception as e:
+            logger.debug(
+                "Switch %s, chassis inventory failed, fetch each PIC when "
+                "needed: %s", self.device.hostname, e
+            )
+            return {}
+
+        pics_part_numbers = zip(pics, map(self._get_pic_part_numbers, pics))
+
+        return {
+            fpc_pic: part_numbers
+            for fpc_pic, part_numbers in pics_part_numbers
+            if part_numbers is not None
+        }
+
+    def _get_chassis_pics(self):
+        """
+        :return pics: list of (fpc, pic) in the chassis inventory, PICs being
+                      directly in their FPC or nested in a MIC
+        """
+        chassis_inventory_xml = self.device._rpc(
+            self._gen_rpc_request_chassis_inventory()
+        )
+        parsed_xml = defusedxml.lxml.fromstring(chassis_inventory_xml)
+
+        pics = []
+        for fpc_el in parsed_xml.iterfind(".//chassis-module"):
+            fpc_match = re.match(
+                r"FPC (\d+)$", (fpc_el.findtext("name") or "").strip()
+            )
+            if not fpc_match:
+                continue
 
-        for p in ports_info.getchildren():
-            if int(p.xpath("port-number")[0].text) == port_index:
-                return p.xpath("sfp-vendor-pno")[0].text
+            for pic_el in fpc_el.xpath(
+                    ".//chassis-sub-module | .//chassis-sub-sub-module"
+            ):
+                pic_match = re.match(
+                    r"PIC (\d+)$", (pic_el.findtext("name") or "").strip()
+                )
+                if not pic_match:
+                    continue
 
-        raise TypeCouldNotBeParsedError(interface)
+                fpc_pic = (int(fpc_match.group(1)), int(pic_match.group(1)))
+                if fpc_pic not in pics:
+                    pics.append(fpc_pic)
+
+        return pics
+
+    def _gen_rpc_request_chassis_inventory(self):
+        get_inventory_el = lxml.etree.Element("get-chassis-inventory")
+        xml_tree = get_inventory_el.getroottree()
+
+        return lxml.etree.tostring(xml_tree).decode()
+
+    def _get_pic_part_numbers(self, fpc_pic):
+        """
+        :return part_numbers: {port: part number} of a PIC, {None: pic type}
+                              if it has no port information, None if its
+                              details could not be fetched
+        """
+        try:
+            chassis_pic_xml = self.device._rpc(
+                self._gen_rpc_request_pic_info(*fpc_pic)
+            )
+            return self._parse_pic_detail(
+                defusedxml.lxml.fromstring(chassis_pic_xml)
+            )
+        except Exception as e:
+            logger.debug(
+                "Switch %s, cannot get details of PIC %s/%s: %s",
+                self.device.hostname, *fpc_pic, e
+            )
+            return None
+
+    def _parse_pic_detail(self, parsed_xml):
+        part_numbers = {}
+        ports = parsed_xml.findall(".//port-information/*")
+        if not ports:
+            pic_type = parsed_xml.findtext(".//pic-type")
+            if pic_type:
+                part_numbers[None] = pic_type.strip()
+
+        for p in ports:
+            port_number = p.findtext("port-number")
+            part_number = p.findtext("sfp-vendor-pno")
+            if port_number and part_number:
+                part_numbers[int(port_number)] = part_number.strip()
+
+        return part_numbers
 
     def _gen_rpc_request_pic_info(self, fpc, pic):
         get_pic_details_el = lxml.etree.Element("get-pic-detail")
@@ -0,0 +1,120 @@
+import threading
+
+from netbox_netprod_importer.api import (
+    build_netbox_api, get_pool_stats, iter_netbox_objects, RETRY_STATUSES
+)
+
+
+class TestBuildNetboxAPI():
+
+    def test_session_options_not_passed_to_client(self):
+        netbox_api = build_netbox_api({
+            "url": "netbox.tld/api", "token": "foo", "pool_size": 12,
+            "retries": 5, "backoff_factor": 2, "gzip": False
+        })
+
+        assert netbox_api.url == "http://netbox.tld/api"
+        assert netbox_api.token == "foo"
+
+        adapter = netbox_api.session.get_adapter("http://netbox.tld/api")
+        assert adapter._pool_maxsize == 12
+        assert adapter.max_retries.total == 5
+        assert adapter.max_retries.backoff_factor == 2
+        assert set(adapter.max_retries.status_forcelist) == set(
+            RETRY_STATUSES
+        )
+        assert netbox_api.session.headers["Accept-Encoding"] == "identity"
+
+    def test_default_session_options(self):
+        netbox_api = build_netbox_api({"url": "https://netbox.tld/api"})
+
+        adapter = netbox_api.session.get_adapter("https://netbox.tld/api")
+        assert adapter._pool_maxsize == 64
+        assert adapter.max_retries.total == 3
+        assert not adapter.max_retries.is_retry("POST", 503)
+        assert adapter.max_retries.is_retry("PATCH", 503)
+        assert "gzip" in netbox_api.session.headers["Accept-Encoding"]
+
+    def test_get_pool_stats(self):
+        netbox_api = build_netbox_api({"url": "https://netbox.tld/api"})
+        assert get_pool_stats(netbox_api) == []
+
+        adapter = netbox_api.session.get_adapter("https://netbox.tld/api")
+        adapter.poolmanager.connection_from_url("https://netbox.tld/api")
+
+        stats = get_pool_stats(netbox_api)
+        assert len(stats) == 1
+        assert stats[0]["host"] == "netbox.tld"
+        assert stats[0]["maxsize"] == 64
+        assert stats[0]["requests"] == 0
+
+
+class StubNetboxAPI():
+    """
+    Stub of a netbox listing, returning at most `max_page_size` objects per
+    page
+    """
+
+    def __init__(self, nb_objects, max_page_size=1000):
+        self.objects = [{"id": i} for i in range(nb_objects)]
+        self.max_page_size = max_page_size
+        self.requested_offsets = []
+        self._lock = threading.Lock()
+
+    def get(self, route, params=None):
+        offset = params["offset"]
+        limit = min(params["limit"], self.max_page_size)
+        with self._lock:
+            self.requested_offsets.append(offset)
+
+        has_next = offset + limit < len(self.objects)
+        return {
+            "count": len(self.objects),
+            "next": "{}?offset={}".format(route, offset + limit)
+                    if has_next else None,
+            "results": self.objects[offset:offset + limit],
+        }
+
+
+class TestIterNetboxObjects():
+
+    def test_all_pages_in_order(self):
+        netbox_api = StubNetboxAPI(2345)
+        objects = list(iter_netbox_objects(
+            netbox_api, "dcim/devices/", page_size=100
+        ))
+
+        assert objects == netbox_api.objects
+        assert sorted(netbox_api.requested_offsets) == list(
+            range(0, 2345, 100)
+        )
+
+    def test_page_size_capped_by_netbox(self):
+        netbox_api = StubNetboxAPI(250, max_page_size=40)
+        objects = list(iter_netbox_objects(
+            netbox_api, "dcim/devices/", page_size=100
+        ))
+
+        assert objects == netbox_api.objects
+
+    def test_single_page(self):
+        netbox_api = StubNetboxAPI(10)
+        objects = list(iter_netbox_objects(netbox_api, "dcim/devices/"))
+
+        assert objects == netbox_api.objects
+        assert netbox_api.requested_offsets == [0]
+
+    def test_filter_params_kept(self):
+        netbox_api = StubNetboxAPI(0)
+        requested_params = []
+        get = netbox_api.get
+        netbox_api.get = lambda route, params: (
+            requested_params.append(params) or get(route, params)
+        )
+
+        assert list(iter_netbox_objects(
+            netbox_api, "dcim/devices/", params={"site": "par1"}
+        )) == []
+        assert requested_params == [
+            {"site": "par1", "limit": 500, "offset": 0}
+        ]
@@ -0,0 +1,101 @@
+import time
+
+from netbox_netprod_importer.cache import NetboxLookupCache, ParserCache
+
+
+class TestNetboxLookupCache():
+
+    def test_get_or_fetch(self):
+        lookup_cache = NetboxLookupCache()
+        fetched = []
+
+        for _ in range(3):
+            value = lookup_cache.get_or_fetch(
+                "devices", "switch-1", lambda: fetched.append(1) or "device"
+            )
+            assert value == "device"
+
+        assert len(fetched) == 1
+        assert lookup_cache.stats["devices"] == {"hits": 2, "misses": 1}
+
+    def test_get_or_fetch_none_not_cached(self):
+        lookup_cache = NetboxLookupCache()
+
+        for _ in range(2):
+            assert lookup_cache.get_or_fetch(
+                "devices", "switch-1", lambda: None
+            ) is None
+
+        assert lookup_cache.stats["devices"] == {"hits": 0, "misses": 2}
+
+    def test_invalidate(self):
+        lookup_cache = NetboxLookupCache()
+        lookup_cache.set("ip", "192.0.2.1/24", ["ip"])
+        lookup_cache.invalidate("ip", "192.0.2.1/24")
+
+        assert lookup_cache.get_or_fetch(
+            "ip", "192.0.2.1/24", lambda: []
+        ) == []
+
+    def test_ttl_setting(self):
+        lookup_cache = NetboxLookupCache({"vlans": {"ttl": 0.01}})
+        lookup_cache.set("vlans", (1, 10), 42)
+        time.sleep(0.02)
+
+        assert lookup_cache.get_or_fetch("vlans", (1, 10), lambda: 43) == 43
+
+
+class TestParserCache():
+
+    def test_device_entries(self):
+        parser_cache = ParserCache()
+        parser_cache.for_device("switch-1").set("cli", "show vlan", "vlans 1")
+
+        assert parser_cache.for_device("switch-1").get(
+            "cli", "show vlan"
+        ) == "vlans 1"
+        assert parser_cache.for_device("switch-2").get(
+            "cli", "show vlan"
+        ) is None
+        assert parser_cache.stats["cli"] == {"hits": 1, "misses": 1}
+
+    def test_invalidate_device(self):
+        parser_cache = ParserCache()
+        for hostname in ("switch-1", "switch-2"):
+            parser_cache.for_device(hostname).set("interfaces", "mode", {})
+
+        parser_cache.invalidate_device("switch-1")
+
+        assert parser_cache.for_device("switch-1").get(
+            "interfaces", "mode"
+        ) is None
+        assert parser_cache.for_device("switch-2").get(
+            "interfaces", "mode"
+        ) == {}
+
+    def test_invalidate_device_frees_entries(self):
+        parser_cache = ParserCache()
+        device_cache = parser_cache.for_device("switch-1")
+        device_cache.set("cli", "show vlan", "vlans 1" * 1024)
+        device_cache.set("interfaces", "mode", {})
+
+        parser_cache.invalidate_device("switch-1")
+
+        assert len(parser_cache._caches["cli"]) == 0
+        assert len(parser_cache._caches["interfaces"]) == 0
+        assert not parser_cache._devices_keys
+
+    def test_evictions(self):
+        parser_cache = ParserCache({"cli": {"maxsize": 2}})
+        device_cache = parser_cache.for_device("switch-1")
+        for cmd in ("show vlan", "show version", "show interface"):
+            device_cache.set("cli", cmd, cmd)
+
+        assert device_cache.get("cli", "show vlan") is None
+        assert parser_cache.stats["cli"]["evictions"] == 1
+
+    def test_settings(self):
+        parser_cache = ParserCache({"chassis": {"ttl": 1}})
+
+        assert parser_cache._caches["chassis"].ttl == 1
+        assert parser_cache._caches["cli"].ttl == 600
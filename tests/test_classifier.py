@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+from netbox_netprod_importer.vendors.classifier import InterfaceTypeClassifier
+from netbox_netprod_importer.vendors.cisco.constants import (
+    InterfacesRegex as CiscoInterfacesRegex
+)
+from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
+from netbox_netprod_importer.vendors.juniper.constants import (
+    InterfacesRegex as JuniperInterfacesRegex
+)
+
+
+CISCO_TYPES = (
+    "SFP-10G-SR", "SFP-10G-LR-S", "SFP-H10GB-CU3M", "DWDM-SFP10G-30.33",
+    "QSFP-40G-SR4", "QSFP-4X10G-LR-S", "QSFP-100G-SR4-S", "QSFP-40/100-SRBD",
+    "SFP-25G-SR-S", "CFP-100G-LR4", "CFP2-100G-ER4", "XENPAK-10GB-LR",
+    "X2-10GB-SR", "1000BASE-SX", "1000BaseLX", "10/100/1000BaseTX",
+    "10/100BaseTX", "10Gbase-SR", "10Gbase-LR", "10Gbase-CU3M", "GLC-T",
+    "unknown", "", "  ",
+)
+JUNIPER_TYPES = (
+    "SFP+-10G-SR", "SFP+-10G-LR", "SFP-1GE-T", "SFP-SX", "QSFP+-40G-SR4",
+    "QSFP+ 40G", "XFP-10G-LR", "10x 1000 Base-TX", "48x 100 Base-TX",
+    "740-021308", "unknown",
+)
+
+
+def legacy_classify(interfaces_regex, type_str):
+    for pattern_iftype in interfaces_regex:
+        if re.match(pattern_iftype.value, type_str):
+            return getattr(NetboxInterfaceTypes, pattern_iftype.name).value
+
+    return None
+
+
+class TestInterfaceTypeClassifier():
+
+    @pytest.mark.parametrize("interfaces_regex,types", (
+        (CiscoInterfacesRegex, CISCO_TYPES),
+        (JuniperInterfacesRegex, JUNIPER_TYPES),
+    ))
+    def test_same_as_matching_each_pattern(self, interfaces_regex, types):
+        classifier = InterfaceTypeClassifier(interfaces_regex)
+        for type_str in types:
+            assert classifier.classify(type_str) == legacy_classify(
+                interfaces_regex, type_str
+            ), type_str
+
+    def test_first_pattern_wins(self):
+        classifier = InterfaceTypeClassifier(CiscoInterfacesRegex)
+
+        assert classifier.classify("SFP-10G-SR") == (
+            NetboxInterfaceTypes.sfp_plus.value
+        )
+        assert classifier.classify("CFP2-100G-ER4") == (
+            NetboxInterfaceTypes.cfp2.value
+        )
+        assert classifier.classify("unknown") is None
+
+    def test_memoized(self):
+        classifier = InterfaceTypeClassifier(CiscoInterfacesRegex)
+        for _ in range(3):
+            classifier.classify("SFP-10G-SR")
+
+        cache_info = classifier.classify.cache_info()
+        assert (cache_info.hits, cache_info.misses) == (2, 1)
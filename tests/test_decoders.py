@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from netbox_netprod_importer.vendors.cisco.decoders import (
+    get_json_decoder, json_decoders
+)
+
+
+OUTPUT = json.dumps({
+    "TABLE_interface": {
+        "ROW_interface": [
+            {"interface": "Ethernet1/1", "partnum": "SFP-10G-SR",
+             "serialnum": "FOO", "TABLE_lane": {"ROW_lane": {"lane": 1}}},
+            {"interface": "Ethernet1/2", "sfp": "not present"},
+        ]
+    }
+}, indent=2)
+
+
+@pytest.fixture(params=sorted(json_decoders))
+def decoder(request):
+    return get_json_decoder(request.param)
+
+
+class TestJSONDecoders():
+
+    def test_get_rows(self, decoder):
+        assert decoder.get_rows(
+            OUTPUT, "TABLE_interface", "ROW_interface"
+        ) == json.loads(OUTPUT)["TABLE_interface"]["ROW_interface"]
+
+    def test_get_rows_fields(self, decoder):
+        assert decoder.get_rows(
+            OUTPUT, "TABLE_interface", "ROW_interface",
+            fields=("interface", "partnum", "TABLE_lane")
+        ) == [
+            {"interface": "Ethernet1/1", "partnum": "SFP-10G-SR",
+             "TABLE_lane": {"ROW_lane": {"lane": 1}}},
+            {"interface": "Ethernet1/2"},
+        ]
+
+    def test_single_row(self, decoder):
+        output = '{"TABLE_vlan": {"ROW_vlan": {"id": "1"}}}'
+
+        assert decoder.get_rows(output, "TABLE_vlan", "ROW_vlan") == [
+            {"id": "1"}
+        ]
+
+    def test_table_not_at_first_level(self, decoder):
+        output = json.dumps({
+            "TABLE_foo": {"ROW_foo": {"TABLE_vlan": {"ROW_vlan": []}}},
+            "TABLE_vlan": {"ROW_vlan": [{"id": "1"}]},
+        })
+
+        assert decoder.get_rows(output, "TABLE_vlan", "ROW_vlan") == [
+            {"id": "1"}
+        ]
+
+    def test_missing_table(self, decoder):
+        with pytest.raises(KeyError):
+            decoder.get_rows(OUTPUT, "TABLE_vlan", "ROW_vlan")
+        with pytest.raises(KeyError):
+            decoder.get_rows(OUTPUT, "TABLE_interface", "ROW_vlan")
+
+    def test_invalid_output(self, decoder):
+        with pytest.raises(json.JSONDecodeError):
+            decoder.get_rows("not json", "TABLE_vlan", "ROW_vlan")
+
+    def test_unknown_decoder(self):
+        with pytest.raises(ValueError):
+            get_json_decoder("unknown")
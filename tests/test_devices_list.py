@@ -0,0 +1,98 @@
+import pytest
+import yaml
+
+from netbox_netprod_importer.devices_list import iter_devices_def
+
+
+class TestIterDevicesDef():
+
+    def test_yaml(self, tmp_path):
+        devices_file = tmp_path / "devices.yml"
+        devices_file.write_text(
+            "switch-1.foo.tld: &switch\n"
+            "  driver: nxos_ssh\n"
+            "  optional_args:\n"
+            "    port: 22\n"
+            "switch-2.bar.tld:\n"
+            "  <<: *switch\n"
+            "  target: 192.0.2.3\n"
+        )
+
+        assert list(iter_devices_def(str(devices_file))) == [
+            ("switch-1.foo.tld", {
+                "driver": "nxos_ssh", "optional_args": {"port": 22}
+            }),
+            ("switch-2.bar.tld", {
+                "driver": "nxos_ssh", "optional_args": {"port": 22},
+                "target": "192.0.2.3"
+            }),
+        ]
+
+    def test_yaml_streamed(self, tmp_path):
+        devices_file = tmp_path / "devices.yml"
+        devices_file.write_text(
+            "switch-1.foo.tld:\n"
+            "  driver: nxos_ssh\n"
+            "switch-2.bar.tld: [invalid\n"
+        )
+
+        devices = iter_devices_def(str(devices_file))
+        assert next(devices) == ("switch-1.foo.tld", {"driver": "nxos_ssh"})
+        with pytest.raises(Exception):
+            next(devices)
+
+    def test_yaml_empty(self, tmp_path):
+        devices_file = tmp_path / "devices.yml"
+        devices_file.write_text("")
+
+        assert list(iter_devices_def(str(devices_file))) == []
+
+    def test_yaml_several_documents(self, tmp_path):
+        devices_file = tmp_path / "devices.yml"
+        devices_file.write_text(
+            "switch-1.foo.tld:\n"
+            "  driver: nxos_ssh\n"
+            "---\n"
+            "switch-2.bar.tld:\n"
+            "  driver: nxos_ssh\n"
+        )
+
+        with pytest.raises(yaml.YAMLError):
+            list(iter_devices_def(str(devices_file)))
+
+    def test_yaml_not_a_mapping(self, tmp_path):
+        devices_file = tmp_path / "devices.yml"
+        devices_file.write_text("- switch-1.foo.tld\n")
+
+        with pytest.raises(ValueError):
+            list(iter_devices_def(str(devices_file)))
+
+    def test_jsonl(self, tmp_path):
+        devices_file = tmp_path / "devices.jsonl"
+        devices_file.write_text(
+            '{"hostname": "switch-1.foo.tld", "driver": "nxos_ssh"}\n'
+            "\n"
+            '{"hostname": "switch-2.bar.tld", "driver": "junos", '
+            '"target": "192.0.2.3"}\n'
+        )
+
+        assert list(iter_devices_def(str(devices_file))) == [
+            ("switch-1.foo.tld", {"driver": "nxos_ssh"}),
+            ("switch-2.bar.tld", {"driver": "junos", "target": "192.0.2.3"}),
+        ]
+
+    def test_csv(self, tmp_path):
+        devices_file = tmp_path / "devices.csv"
+        devices_file.write_text(
+            "hostname,driver,target,optional_args\n"
+            "switch-1.foo.tld,nxos_ssh,,\n"
+            'switch-2.bar.tld,junos,192.0.2.3,"{""port"": 830}"\n'
+        )
+
+        assert list(iter_devices_def(str(devices_file))) == [
+            ("switch-1.foo.tld", {"driver": "nxos_ssh"}),
+            ("switch-2.bar.tld", {
+                "driver": "junos", "target": "192.0.2.3",
+                "optional_args": {"port": 830}
+            }),
+        ]
@@ -2,13 +2,17 @@ import ipaddress
 import os
 import socket
 import napalm
+from napalm.base.exceptions import CommandErrorException
 import pytest
 import json
 
+from netbox_netprod_importer.__main__ import _poll
+from netbox_netprod_importer.cache import ParserCache
 from netbox_netprod_importer.importer import (
-    napalm as importer_napalm, DeviceImporter
+    napalm as importer_napalm, DeviceImporter, get_device_classes
 )
 from netbox_netprod_importer.exceptions import NoReverseFoundError
+from netbox_netprod_importer.vendors import StubParser
 
 
 BASE_PATH = os.path.dirname(__file__)
@@ -38,6 +42,7 @@ class BaseTestImporter():
             "get_network_driver",
             lambda *args: mock_driver
         )
+        get_device_classes.cache_clear()
 
     def test_resolve_primary_ip(self, mocker):
         m = mocker.patch("socket.getaddrinfo")
@@ -70,6 +75,33 @@ class BaseTestImporter():
 
         assert sorted(ip.keys()) == sorted(("primary_ip4", ))
 
+    def test_device_released_after_context(self):
+        with self.importer:
+            device = self.importer.device
+            parser = self.importer.specific_parser
+            assert parser.device is device
+
+        assert self.importer._device is None
+        assert self.importer._specific_parser is None
+        assert get_device_classes.cache_info().currsize == 1
+
+    def test_parser_cache_on_reopen(self):
+        self.importer.parser_cache = ParserCache()
+        with self.importer:
+            self.importer.specific_parser.cache.set("cli", "cmd", "output")
+
+        with self.importer:
+            output = self.importer.specific_parser.cache.get("cli", "cmd")
+
+        assert output is None
+
+    def test_parser_cache_freed_on_release(self):
+        self.importer.parser_cache = ParserCache()
+        with self.importer:
+            self.importer.specific_parser.cache.set("cli", "cmd", "output")
+
+        assert len(self.importer.parser_cache._caches["cli"]) == 0
+
     def stub_get_interface_type(self, monkeypatch):
         monkeypatch.setattr(
             self.importer.specific_parser,
@@ -78,6 +110,86 @@ class BaseTestImporter():
         )
 
 
+class FakeNapalmDriver():
+    """
+    Napalm driver recording its sessions and the getters called in them
+    """
+
+    def __init__(self, hostname, username, password, optional_args=None):
+        self.hostname = hostname
+        self.device = None
+        #: [[getter, ...]], getters called in each session
+        self.sessions = []
+
+    def open(self):
+        self.device = object()
+        self.sessions.append([])
+
+    def close(self):
+        self.device = None
+
+    def _call(self, getter):
+        if self.device is None:
+            raise ConnectionError("session closed")
+        self.sessions[-1].append(getter)
+
+    def get_facts(self):
+        self._call("get_facts")
+        return {"serial_number": "ABC123"}
+
+    def get_interfaces(self):
+        self._call("get_interfaces")
+        return {"eth0": {
+            "is_enabled": True, "description": "", "mac_address": "",
+            "mtu": 1500,
+        }}
+
+    def get_interfaces_ip(self):
+        self._call("get_interfaces_ip")
+        return {"eth0": {"ipv4": {"192.0.2.1": {"prefix_length": 24}}}}
+
+    def get_lldp_neighbors(self):
+        self._call("get_lldp_neighbors")
+        return {"eth0": [{"hostname": "switch-2", "port": "eth1"}]}
+
+
+class TestSingleSession():
+
+    @pytest.fixture(autouse=True)
+    def mock_device_classes(self, monkeypatch, mocker):
+        monkeypatch.setattr(
+            "netbox_netprod_importer.importer.get_device_classes",
+            lambda *args: (FakeNapalmDriver, StubParser)
+        )
+        mocker.patch("socket.getaddrinfo", side_effect=socket.gaierror)
+
+    def test_session_reused_across_getters(self):
+        importer = DeviceImporter("switch-1", "fake")
+        with importer:
+            device = importer.device
+            props = _poll(importer, with_neighbours=True)
+
+        assert device.sessions == [[
+            "get_facts", "get_interfaces", "get_interfaces_ip",
+            "get_lldp_neighbors",
+        ]]
+        assert props["serial"] == "ABC123"
+        assert props["neighbours"] == [
+            {"local_port": "eth0", "hostname": "switch-2", "port": "eth1"}
+        ]
+
+    def test_session_per_device(self):
+        importers = [DeviceImporter(h, "fake") for h in ("sw-1", "sw-2")]
+        devices = []
+        for importer in importers:
+            with importer:
+                devices.append(importer.device)
+                _poll(importer, with_neighbours=True)
+
+        assert devices[0] is not devices[1]
+        assert [len(d.sessions) for d in devices] == [1, 1]
+
+
 class TestIOSImporter(BaseTestImporter):
     profile = "ios"
     path = "mock_driver/global/cisco/ios/"
@@ -94,6 +206,45 @@ class TestIOSImporter(BaseTestImporter):
 
         assert interfaces == json.loads(data)
 
+    def test_get_interfaces_lag_per_interface_fallback(self, monkeypatch):
+        self.stub_get_interface_type(monkeypatch)
+        monkeypatch.setattr(
+            self.importer.specific_parser,
+            "_get_interfaces_conf_from_running_config",
+            lambda *args: {}
+        )
+        with self.importer:
+            interfaces = self.importer.get_interfaces()
+        with open(
+                "{}/{}/test_get_interfaces.json".format(BASE_PATH, self.path),
+                "r"
+        ) as myfile:
+            data = myfile.read()
+
+        assert interfaces == json.loads(data)
+
+    def test_get_interfaces_lag_running_config_error(self, monkeypatch):
+        self.stub_get_interface_type(monkeypatch)
+        with self.importer:
+            device = self.importer.device
+            cli = device.cli
+
+            def failing_cli(cmds):
+                if "show running-config" in cmds:
+                    raise CommandErrorException("privilege level too low")
+                return cli(cmds)
+
+            monkeypatch.setattr(device, "cli", failing_cli)
+            interfaces = self.importer.get_interfaces()
+        with open(
+                "{}/{}/test_get_interfaces.json".format(BASE_PATH, self.path),
+                "r"
+        ) as myfile:
+            data = myfile.read()
+
+        assert interfaces == json.loads(data)
+
+
 class TestNXOSImporter(BaseTestImporter):
     profile = "nxos"
     path = "mock_driver/global/cisco/nxos/"
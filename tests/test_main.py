@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from netbox_netprod_importer import __main__ as main
+
+
+class FakeImporter():
+
+    def __init__(self, hostname, events, fail=False):
+        self.hostname = hostname
+        self.events = events
+        self.fail = fail
+        self.polled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def prefetch(self, with_neighbours=False):
+        pass
+
+    def poll(self):
+        if self.fail:
+            raise ValueError("poll failed")
+
+        self.events.append(("poll", self.hostname))
+        self.polled = True
+        return {"hostname": self.hostname}
+
+
+class TestPipelinedDevicesPolling():
+
+    @pytest.fixture
+    def events(self):
+        return []
+
+    @pytest.fixture
+    def push_allowed(self):
+        push_allowed = threading.Event()
+        push_allowed.set()
+
+        return push_allowed
+
+    @pytest.fixture(autouse=True)
+    def mock_pusher(self, monkeypatch, events, push_allowed):
+        class FakePusher():
+
+            def __init__(self, netbox_api, hostname, props, **kwargs):
+                self.hostname = hostname
+                self.props = props
+
+            def push(self):
+                push_allowed.wait()
+                if self.hostname == "switch-fail-push":
+                    raise ValueError("push failed")
+                events.append(("push", self.hostname))
+
+        monkeypatch.setattr(main, "get_netbox_api", lambda: None)
+        monkeypatch.setattr(main, "NetboxDevicePropsPusher", FakePusher)
+
+    def get_importers(self, events, *hostnames, failing=()):
+        return {
+            h: FakeImporter(h, events, fail=h in failing) for h in hostnames
+        }
+
+    def test_ordering(self, events):
+        hostnames = ["switch-{}".format(i) for i in range(5)]
+        importers = self.get_importers(events, *hostnames)
+
+        polled = list(main._pipelined_devices_polling(
+            importers, threads=1, push_threads=1, queue_size=1
+        ))
+
+        assert [h for h, _ in polled] == hostnames
+        assert [props for _, props in polled] == [
+            {"hostname": h} for h in hostnames
+        ]
+        for h in hostnames:
+            assert events.index(("poll", h)) < events.index(("push", h))
+
+    def test_queue_bound(self, events, push_allowed):
+        push_allowed.clear()
+        importers = self.get_importers(
+            events, *("switch-{}".format(i) for i in range(10))
+        )
+        polled = []
+        consumer = threading.Thread(target=lambda: polled.extend(
+            main._pipelined_devices_polling(
+                importers, threads=2, push_threads=1, queue_size=1
+            )
+        ))
+        consumer.start()
+
+        # 1 device being pushed, 1 in the queue, and 1 waiting for room in
+        # the queue in each polling thread
+        deadline = time.monotonic() + 5
+        while len(events) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert sum(i.polled for i in importers.values()) == 4
+
+        push_allowed.set()
+        consumer.join(timeout=5)
+        assert not consumer.is_alive()
+        assert len(polled) == 10
+
+    def test_errors(self, events, caplog):
+        importers = self.get_importers(
+            events, "switch-1", "switch-fail-push", "switch-fail-poll",
+            failing=("switch-fail-poll",)
+        )
+
+        with caplog.at_level(logging.ERROR, logger="netbox_importer"):
+            polled = list(main._pipelined_devices_polling(
+                importers, threads=2, push_threads=2
+            ))
+
+        assert [h for h, _ in polled] == ["switch-1"]
+        errors = sorted(r.getMessage() for r in caplog.records)
+        assert errors == [
+            "Error when polling device switch-fail-poll: poll failed",
+            "Error when polling device switch-fail-push: push failed",
+        ]
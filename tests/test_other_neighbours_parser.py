@@ -3,7 +3,7 @@ import napalm
 import pytest
 
 from netbox_netprod_importer.importer import (
-    napalm as importer_napalm, DeviceImporter
+    napalm as importer_napalm, DeviceImporter, get_device_classes
 )
 
 
@@ -38,6 +38,7 @@ class TestOtherNeighboursParcer():
             "get_network_driver",
             lambda *args: mock_driver
         )
+        get_device_classes.cache_clear()
 
     def test_get_neighbours(self):
         if not self.profile:
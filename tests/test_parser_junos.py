@@ -0,0 +1,197 @@
+import threading
+import time
+
+import defusedxml.lxml
+from jnpr.junos.exception import RpcError
+import pytest
+
+from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
+from netbox_netprod_importer.vendors.juniper import JunOSParser
+
+
+CHASSIS_INVENTORY = """
+<chassis-inventory>
+  <chassis>
+    <name>Chassis</name>
+    <chassis-module>
+      <name>Routing Engine 0</name>
+    </chassis-module>
+    <chassis-module>
+      <name>FPC 0</name>
+      <chassis-sub-module><name>CPU</name></chassis-sub-module>
+      <chassis-sub-module><name>PIC 0</name></chassis-sub-module>
+      <chassis-sub-module><name>PIC 1</name></chassis-sub-module>
+    </chassis-module>
+    <chassis-module>
+      <name>FPC 1</name>
+      <chassis-sub-module><name>PIC 0</name></chassis-sub-module>
+    </chassis-module>
+    <chassis-module>
+      <name>FPC 2</name>
+      <chassis-sub-module>
+        <name>MIC 0</name>
+        <chassis-sub-sub-module>
+          <name>PIC 0</name>
+          <chassis-sub-sub-sub-module>
+            <name>Xcvr 0</name>
+          </chassis-sub-sub-sub-module>
+        </chassis-sub-sub-module>
+      </chassis-sub-module>
+    </chassis-module>
+  </chassis>
+</chassis-inventory>
+"""
+
+#: {(fpc, pic): get-pic-detail reply}
+PIC_DETAILS = {
+    (0, 0): """
+<fpc-information>
+  <fpc>
+    <pic-detail>
+      <pic-type>48x 10/100/1000 Base-T</pic-type>
+    </pic-detail>
+  </fpc>
+</fpc-information>
+""",
+    (0, 1): """
+<fpc-information>
+  <fpc>
+    <pic-detail>
+      <pic-type>4x 10G SFP+</pic-type>
+      <port-information>
+        <port>
+          <port-number>0</port-number>
+          <sfp-vendor-pno>SFP-10G-SR</sfp-vendor-pno>
+        </port>
+        <port>
+          <port-number>1</port-number>
+          <sfp-vendor-pno>QSFP+-40G-SR4</sfp-vendor-pno>
+        </port>
+        <port>
+          <port-number>2</port-number>
+        </port>
+      </port-information>
+    </pic-detail>
+  </fpc>
+</fpc-information>
+""",
+    (2, 0): """
+<fpc-information>
+  <fpc>
+    <pic-detail>
+      <pic-type>2x 10GE XFP</pic-type>
+      <port-information>
+        <port>
+          <port-number>0</port-number>
+          <sfp-vendor-pno>XFP-10G-SR</sfp-vendor-pno>
+        </port>
+      </port-information>
+    </pic-detail>
+  </fpc>
+</fpc-information>
+""",
+}
+
+
+class FakeJunOSDevice():
+    """
+    Answer the chassis inventory and PIC details RPCs, recording if RPCs were
+    sent concurrently on the session
+    """
+
+    def __init__(self, chassis_inventory=CHASSIS_INVENTORY):
+        self.hostname = "localhost"
+        self.chassis_inventory = chassis_inventory
+        self.rpcs = []
+        self.overlapping_rpcs = False
+        self._lock = threading.Lock()
+        self._rpc_in_progress = False
+
+    def _rpc(self, rpc):
+        with self._lock:
+            if self._rpc_in_progress:
+                self.overlapping_rpcs = True
+            self._rpc_in_progress = True
+        try:
+            # let a concurrent RPC start, if any
+            time.sleep(0.005)
+            return self._answer_rpc(rpc)
+        finally:
+            with self._lock:
+                self._rpc_in_progress = False
+
+    def _answer_rpc(self, rpc):
+        parsed_rpc = defusedxml.lxml.fromstring(rpc)
+        self.rpcs.append(parsed_rpc.tag)
+
+        if parsed_rpc.tag == "get-chassis-inventory":
+            return self.chassis_inventory
+
+        fpc_pic = tuple(
+            int(parsed_rpc.findtext(slot)) for slot in ("fpc-slot", "pic-slot")
+        )
+        try:
+            return PIC_DETAILS[fpc_pic]
+        except KeyError:
+            raise RpcError()
+
+
+class TestJunOSParser():
+
+    @pytest.fixture(autouse=True)
+    def build_parser(self):
+        self.device = FakeJunOSDevice()
+        self.parser = JunOSParser(self.device)
+
+    def test_get_pics_part_numbers(self):
+        assert self.parser._get_pics_part_numbers() == {
+            (0, 0): {None: "48x 10/100/1000 Base-T"},
+            (0, 1): {0: "SFP-10G-SR", 1: "QSFP+-40G-SR4"},
+            (2, 0): {0: "XFP-10G-SR"},
+        }
+        assert self.device.rpcs == (
+            ["get-chassis-inventory"] + ["get-pic-detail"] * 4
+        )
+        assert not self.device.overlapping_rpcs
+
+    def test_get_interface_type(self):
+        self.parser.prefetch()
+
+        assert (
+            self.parser.get_interface_type("ge-0/0/12") ==
+            NetboxInterfaceTypes.eth1000.value
+        )
+        assert (
+            self.parser.get_interface_type("xe-0/1/0") ==
+            NetboxInterfaceTypes.sfp_plus.value
+        )
+        assert (
+            self.parser.get_interface_type("et-0/1/1") ==
+            NetboxInterfaceTypes.qsfp_plus.value
+        )
+        assert (
+            self.parser.get_interface_type("xe-2/0/0") ==
+            NetboxInterfaceTypes.xfp.value
+        )
+        for ifname in ("xe-0/1/2", "xe-1/0/0", "lo0"):
+            assert self.parser.get_interface_type(ifname) == "Other"
+
+        # only the PIC failing in bulk is fetched again, once
+        assert self.device.rpcs.count("get-pic-detail") == 5
+        self.parser.get_interface_type("xe-1/0/1")
+        assert self.device.rpcs.count("get-pic-detail") == 5
+
+    def test_inventory_failed(self):
+        self.device.chassis_inventory = "<chassis-inventory"
+        self.parser.prefetch()
+
+        assert self.device.rpcs == ["get-chassis-inventory"]
+        assert (
+            self.parser.get_interface_type("xe-0/1/0") ==
+            NetboxInterfaceTypes.sfp_plus.value
+        )
+        assert (
+            self.parser.get_interface_type("et-0/1/1") ==
+            NetboxInterfaceTypes.qsfp_plus.value
+        )
+        assert self.device.rpcs == ["get-chassis-inventory", "get-pic-detail"]
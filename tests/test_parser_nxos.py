@@ -1,5 +1,7 @@
 import os
 import napalm
+from napalm.nxapi_plumbing.errors import NXAPICommandError
+from napalm.nxos.nxos import NXOSDriver
 import pytest
 
 from netbox_netprod_importer.vendors.cisco import NXOSParser
@@ -9,6 +11,54 @@ from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
 BASE_PATH = os.path.dirname(__file__)
 
 
+def get_mocked_outputs(end_selection=""):
+    """
+    :return outputs: {command: mocked output} of the batched commands
+    """
+    mock_path = os.path.join(BASE_PATH, "mock_driver/specific/cisco/nxos")
+    outputs = {}
+    for cmd, filename in (
+            ("show interface transceiver",
+             "cli.1.show_interface_transceiver_json.0"),
+            ("show interface status",
+             "cli.2.show_interface_status_json.0"),
+            ("show port-channel summary",
+             "cli.1.show_port_channel_summary_json.0"),
+            ("show lldp neighbors detail",
+             "cli.1.show_lldp_neighbors_detail_json.0"),
+    ):
+        with open(os.path.join(mock_path, filename)) as f:
+            outputs[cmd + end_selection] = f.read()
+
+    return outputs
+
+
+class FakeNXAPIDevice():
+    """
+    nxapi_plumbing device answering raw text commands, in the jsonrpc
+    response shape, and recording each call
+    """
+
+    def __init__(self, outputs, fail_show_list=False):
+        self.outputs = outputs
+        self.fail_show_list = fail_show_list
+        self.api = type("FakeNXAPIClient", (), {"cmd_method_raw": None})()
+        self.calls = []
+
+    def show_list(self, commands, raw_text=False):
+        self.calls.append(("show_list", commands))
+        if self.fail_show_list:
+            raise NXAPICommandError(commands[-1], "Invalid command")
+
+        return [
+            {"command": cmd, "result": self.outputs[cmd]} for cmd in commands
+        ]
+
+    def show(self, command, raw_text=False):
+        self.calls.append(("show", command))
+        return self.outputs[command]
+
+
 class TestNXOSParser():
     device = None
 
@@ -161,3 +211,114 @@ class TestNXOSParser():
         ]
         assert len([x for x in self.parser.get_detailed_lldp_neighbours()
                     if x not in must]) == 0
+
+    def mock_batch_cli(self, monkeypatch):
+        """
+        Serve the mocked outputs, whatever the call number, and record each
+        call
+        """
+        outputs = get_mocked_outputs(" | json")
+        calls = []
+
+        def cli(commands):
+            calls.append(commands)
+            return {cmd: outputs[cmd] for cmd in commands}
+
+        monkeypatch.setattr(self.device, "cli", cli)
+        monkeypatch.setattr(self.parser, "poll_commands", (
+            "show interface transceiver", "show interface status",
+            "show port-channel summary"
+        ))
+
+        return calls
+
+    def test_prefetch(self, monkeypatch):
+        calls = self.mock_batch_cli(monkeypatch)
+        self.parser.prefetch(neighbours_protocols=("lldp",))
+
+        assert (
+            self.parser.get_interface_type("Ethernet1/1") ==
+            NetboxInterfaceTypes.cfp.value
+        )
+        assert self.parser.get_interface_type("mgmt0") == "Other"
+        assert self.parser.get_interfaces_lag([])["Ethernet1/21"] == (
+            "port-channel12"
+        )
+        assert len(list(self.parser.get_detailed_lldp_neighbours())) == 4
+        assert len(calls) == 1
+
+    def test_prefetch_failed(self, monkeypatch):
+        calls = self.mock_batch_cli(monkeypatch)
+        monkeypatch.setattr(self.parser, "poll_commands", (
+            "show interface transceiver", "show unknown"
+        ))
+        self.parser.prefetch()
+
+        assert (
+            self.parser.get_interface_type("Ethernet1/1") ==
+            NetboxInterfaceTypes.cfp.value
+        )
+        assert calls == [
+            ["show interface transceiver | json", "show unknown | json"],
+            ["show interface transceiver | json"],
+        ]
+
+    def test_get_table_rows(self):
+        for cmd_output in (
+                '{"TABLE_vlan": {"ROW_vlan": {"id": "1", "name": "foo"}}}',
+                'Warning: foo. {"TABLE_vlan": {"ROW_vlan": '
+                '{"id": "1", "name": "foo"}}}',
+                {"TABLE_vlan": {"ROW_vlan": {"id": "1", "name": "foo"}}},
+        ):
+            assert self.parser._get_table_rows(
+                cmd_output, "TABLE_vlan", "ROW_vlan"
+            ) == [{"id": "1", "name": "foo"}]
+
+
+class TestNXOSParserNXAPI():
+
+    poll_commands = (
+        "show interface transceiver", "show interface status",
+        "show port-channel summary"
+    )
+
+    def build_parser(self, monkeypatch, **kwargs):
+        self.device = NXOSDriver("localhost", "foo", "bar")
+        self.device.device = FakeNXAPIDevice(get_mocked_outputs(), **kwargs)
+        self.parser = NXOSParser(self.device)
+        monkeypatch.setattr(self.parser, "poll_commands", self.poll_commands)
+
+    def test_prefetch(self, monkeypatch):
+        self.build_parser(monkeypatch)
+        self.parser.prefetch(neighbours_protocols=("lldp",))
+
+        cmds = list(self.poll_commands) + ["show lldp neighbors detail"]
+        assert self.device.device.calls == [("show_list", cmds)]
+        for cmd in cmds:
+            assert (
+                self.parser.cache.get("cli", cmd) ==
+                self.device.device.outputs[cmd]
+            )
+
+        assert (
+            self.parser.get_interface_type("Ethernet1/1") ==
+            NetboxInterfaceTypes.cfp.value
+        )
+        assert self.parser.get_interfaces_lag([])["Ethernet1/21"] == (
+            "port-channel12"
+        )
+        assert len(list(self.parser.get_detailed_lldp_neighbours())) == 4
+        assert len(self.device.device.calls) == 1
+
+    def test_prefetch_failed(self, monkeypatch):
+        self.build_parser(monkeypatch, fail_show_list=True)
+        self.parser.prefetch()
+
+        assert (
+            self.parser.get_interface_type("Ethernet1/1") ==
+            NetboxInterfaceTypes.cfp.value
+        )
+        assert self.device.device.calls == [
+            ("show_list", list(self.poll_commands)),
+            ("show", "show interface transceiver"),
+        ]
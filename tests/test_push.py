@@ -0,0 +1,732 @@
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import logging
+import threading
+
+from netboxapi import NetboxAPI
+import pytest
+
+from netbox_netprod_importer.exceptions import DeviceNotFoundError
+from netbox_netprod_importer.push import (
+    IndexedInterfaces, InterfaceRecord, InterfacesCache, LinksRegistry,
+    NetboxDevicePropsPusher, NetboxInterconnectionsPusher
+)
+from netbox_netprod_importer.results import get_props_hashes, PollResultsStore
+
+
+class StubNetboxInterface():
+
+    def __init__(self, name, mac_address=None):
+        self.name = name
+        self.mac_address = mac_address
+
+
+class StubNetboxCable():
+
+    def __init__(self, id, netif_a, netif_b):
+        self.id = id
+        self.termination_a_type = self.termination_b_type = "dcim.interface"
+        self.termination_a_id = netif_a.id
+        self.termination_b_id = netif_b.id
+
+
+def get_indexed_interfaces(*interfaces):
+    return IndexedInterfaces((i.name, i) for i in interfaces)
+
+
+class TestIndexedInterfaces():
+
+    def test_get_by_derivative(self):
+        te = StubNetboxInterface("TenGigabitEthernet1/0/1")
+        xe = StubNetboxInterface("xe-0/0/1")
+        interfaces = get_indexed_interfaces(te, xe)
+
+        assert interfaces.get_by_derivative("Te1/0/1") is te
+        assert interfaces.get_by_derivative("TenGigabitEthernet1/0/1") is te
+        assert interfaces.get_by_derivative("xe0/0/1") is xe
+        assert interfaces.get_by_derivative("Gi1/0/1") is None
+
+    def test_get_by_derivative_first_interface_wins(self):
+        short = StubNetboxInterface("Te1/0/1")
+        full = StubNetboxInterface("TenGigabitEthernet1/0/1")
+        interfaces = get_indexed_interfaces(short, full)
+
+        assert interfaces.get_by_derivative("Te1/0/1") is short
+
+    def test_get_by_mac(self):
+        a = StubNetboxInterface("eth0", "AA:BB:CC:DD:EE:FF")
+        b = StubNetboxInterface("eth1", "aabb.ccdd.ee00")
+        c = StubNetboxInterface("eth2", "AA:BB:CC:DD:EE:00")
+        no_mac = StubNetboxInterface("lo0")
+        interfaces = get_indexed_interfaces(a, b, c, no_mac)
+
+        assert interfaces.get_by_mac("aabb.ccdd.eeff") == [a]
+        assert interfaces.get_by_mac("AA:BB:CC:DD:EE:00") == [b, c]
+        assert interfaces.get_by_mac("00:00:00:00:00:01") == []
+
+
+class StubNetboxAPI():
+    """
+    Stub of netbox listings and writes, returning at most `max_page_size`
+    objects per page
+
+    Listings are filtered by the fields of their params, "<field>_id" params
+    matching the id of a nested object, and lists matching any of their
+    values.
+    """
+
+    def __init__(self, objects_by_route, max_page_size=1000):
+        self.objects_by_route = objects_by_route
+        self.max_page_size = max_page_size
+        #: [(method, route, params or json)]
+        self.requests = []
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+
+    def build_model_route(self, app_name, model):
+        return "{}/{}/".format(app_name, model)
+
+    def get(self, route, params=None):
+        params = dict(params or {})
+        with self._lock:
+            self.requests.append(("get", route, params))
+
+        base_route, _, obj_id = route.rstrip("/").rpartition("/")
+        if obj_id.isdigit():
+            return next(
+                obj for obj in self.objects_by_route[base_route + "/"]
+                if obj["id"] == int(obj_id)
+            )
+
+        offset = params.pop("offset", 0)
+        limit = min(params.pop("limit", 50), self.max_page_size)
+        objects = [
+            obj for obj in self.objects_by_route.get(route, [])
+            if all(
+                self._match(obj, field, value)
+                for field, value in params.items()
+            )
+        ]
+
+        return {
+            "count": len(objects),
+            "next": "next" if offset + limit < len(objects) else None,
+            "results": objects[offset:offset + limit],
+        }
+
+    @staticmethod
+    def _match(obj, field, value):
+        if field.endswith("_id"):
+            current = (obj.get(field[:-3]) or {}).get("id")
+        else:
+            current = obj.get(field)
+
+        values = value if isinstance(value, list) else [value]
+        return any(
+            current is None if v == "null" else str(current) == str(v)
+            for v in values
+        )
+
+    def post(self, route, json):
+        self.requests.append(("post", route, json))
+        created = []
+        for obj in (json if isinstance(json, list) else [json]):
+            obj = dict(obj, id=next(self._ids))
+            if "device" in obj:
+                obj["device"] = {"id": obj["device"], "url": "device"}
+            self.objects_by_route[route].append(obj)
+            created.append(obj)
+
+        return created if isinstance(json, list) else created[0]
+
+    def patch(self, route, json):
+        self.requests.append(("patch", route, json))
+
+    def put(self, route, json):
+        self.requests.append(("put", route, json))
+
+    def delete(self, route, json):
+        self.requests.append(("delete", route, json))
+        deleted_ids = set(obj["id"] for obj in json)
+        self.objects_by_route[route] = [
+            obj for obj in self.objects_by_route[route]
+            if obj["id"] not in deleted_ids
+        ]
+
+    def get_writes(self):
+        return [r for r in self.requests if r[0] != "get"]
+
+
+class StubNetboxSite():
+
+    def __init__(self, id):
+        self.id = id
+        self.name = "site-{}".format(id)
+
+
+def get_stub_netbox_interface(id, name, **props):
+    return dict({
+        "id": id, "name": name, "device": {"id": 1, "url": "device"},
+        "type": {"value": "other", "label": "Other"}, "enabled": True,
+        "description": "", "mac_address": None, "mtu": None,
+    }, **props)
+
+
+def get_polled_interface(**props):
+    return dict({
+        "enabled": True, "description": "", "mac_address": None,
+        "type": "Other", "mode": None, "untagged_vlan": None,
+        "tagged_vlans": [], "mtu": None,
+    }, **props)
+
+
+def get_device_props_pusher(netbox_api, props, **kwargs):
+    pusher = NetboxDevicePropsPusher(netbox_api, "switch-1", props, **kwargs)
+    pusher._device = pusher._mappers["devices"]._build_new_mapper_from(
+        {"id": 1, "name": "switch-1", "site": {"id": 1, "url": "site"}},
+        "dcim/devices/1/"
+    )
+    pusher._device.site = StubNetboxSite(1)
+    pusher.lookup_cache.set("choices", "dcim_choices", {
+        "interface:type": [{"value": "other", "label": "Other"}],
+    })
+
+    return pusher
+
+
+class TestSyncInterfaces():
+
+    def test_create_update_delete(self):
+        netbox_api = StubNetboxAPI({
+            "dcim/interfaces/": [
+                get_stub_netbox_interface(1, "eth0"),
+                get_stub_netbox_interface(2, "eth1"),
+                get_stub_netbox_interface(3, "eth2"),
+                get_stub_netbox_interface(4, "eth3"),
+            ],
+            "ipam/ip-addresses/": [],
+        }, max_page_size=2)
+        pusher = get_device_props_pusher(netbox_api, {"interfaces": {
+            "eth0": get_polled_interface(),
+            "eth1": get_polled_interface(description="uplink"),
+            "eth2": get_polled_interface(),
+            "eth4": get_polled_interface(mtu=9000),
+        }}, bulk=True, overwrite=True)
+
+        interfaces = pusher._sync_interfaces()
+
+        assert netbox_api.get_writes() == [
+            ("delete", "dcim/interfaces/", [{"id": 4}]),
+            ("post", "dcim/interfaces/", [{
+                "enabled": True, "description": "", "mac_address": None,
+                "type": "other", "mtu": 9000, "device": 1, "name": "eth4",
+            }]),
+            ("patch", "dcim/interfaces/", [
+                {"description": "uplink", "id": 2}
+            ]),
+        ]
+        assert sorted(interfaces) == ["eth0", "eth1", "eth2", "eth4"]
+        assert pusher.stats == {"written": 3, "skipped": 2}
+
+    def test_unmatched_kept_without_overwrite(self):
+        netbox_api = StubNetboxAPI({
+            "dcim/interfaces/": [
+                get_stub_netbox_interface(1, "eth0"),
+                get_stub_netbox_interface(2, "eth1"),
+            ],
+        })
+        pusher = get_device_props_pusher(netbox_api, {"interfaces": {
+            "eth0": get_polled_interface(),
+        }}, bulk=True)
+
+        pusher._sync_interfaces()
+
+        assert netbox_api.get_writes() == []
+
+
+class TestPushInterfaces():
+
+    def test_unchanged_deleted_interface_recreated(self):
+        netbox_api = StubNetboxAPI({
+            "dcim/interfaces/": [get_stub_netbox_interface(1, "eth0")],
+        })
+        props = {"serial": "ABC123", "interfaces": {
+            "eth0": get_polled_interface(), "eth1": get_polled_interface(),
+        }}
+        results_store = PollResultsStore(":memory:")
+        results_store.save("switch-1", *get_props_hashes(props))
+        # only the device changed since its last push
+        props["serial"] = "DEF456"
+        pusher = get_device_props_pusher(
+            netbox_api, props, results_store=results_store
+        )
+        pusher._load_unchanged(*get_props_hashes(props))
+
+        interfaces = pusher._push_interfaces()
+
+        assert sorted(interfaces) == ["eth1"]
+        assert [
+            r[2]["name"] for r in netbox_api.get_writes() if r[0] == "post"
+        ] == ["eth1"]
+        assert pusher.stats["skipped"] == 1
+
+    def test_missing_lag_skipped(self, caplog):
+        netbox_api = StubNetboxAPI({
+            "dcim/interfaces/": [get_stub_netbox_interface(1, "eth0")],
+        })
+        pusher = get_device_props_pusher(netbox_api, {"interfaces": {
+            "eth0": get_polled_interface(lag="ae0"),
+        }})
+
+        with caplog.at_level(logging.WARNING, logger="netbox_importer"):
+            interfaces = pusher._push_interfaces()
+
+        assert sorted(interfaces) == ["eth0"]
+        assert netbox_api.get_writes() == []
+        assert "lag ae0 of interface eth0 not found" in caplog.text
+
+    def test_bulk_missing_lag_skipped(self, caplog):
+        netbox_api = StubNetboxAPI({
+            "dcim/interfaces/": [get_stub_netbox_interface(1, "eth0")],
+        })
+        pusher = get_device_props_pusher(netbox_api, {"interfaces": {
+            "eth0": get_polled_interface(lag="ae0"),
+        }}, bulk=True)
+
+        with caplog.at_level(logging.WARNING, logger="netbox_importer"):
+            pusher._sync_interfaces()
+
+        assert netbox_api.get_writes() == []
+        assert "lag ae0 of interface eth0 not found" in caplog.text
+
+
+class TestIndexIPAddresses():
+
+    @pytest.fixture
+    def netbox_api(self):
+        return StubNetboxAPI({"ipam/ip-addresses/": [
+            {"id": 1, "address": "192.0.2.1/24",
+             "interface": {"id": 10, "url": "interface"}},
+            {"id": 2, "address": "192.0.2.2/24", "interface": None},
+            {"id": 3, "address": "192.0.2.2/25", "interface": None},
+            {"id": 4, "address": "198.51.100.1/24", "interface": None},
+        ]})
+
+    @pytest.fixture
+    def pusher(self, netbox_api):
+        return get_device_props_pusher(netbox_api, {"interfaces": {}})
+
+    def test_index_reused(self, netbox_api, pusher):
+        pusher._index_ip_addresses("192.0.2.1/24", "192.0.2.2/24")
+        pusher._index_ip_addresses("192.0.2.2/24")
+        netbox_if = pusher._mappers["interfaces"]._build_new_mapper_from(
+            {"id": 10, "name": "eth0"}, "dcim/interfaces/10/"
+        )
+
+        addresses = pusher._attach_interface_to_ip_addresses(
+            netbox_if, "192.0.2.1/24", "192.0.2.2/24"
+        )
+
+        assert [a.id for a in addresses] == [1, 2]
+        listings = [r for r in netbox_api.requests if r[0] == "get"]
+        assert len(listings) == 1
+        assert listings[0][1] == "ipam/ip-addresses/"
+        assert listings[0][2]["address"] == ["192.0.2.1/24", "192.0.2.2/24"]
+        # only the unassigned address is written
+        assert netbox_api.get_writes() == [(
+            "put", "ipam/ip-addresses/2/",
+            {"id": 2, "address": "192.0.2.2/24", "interface": 10}
+        )]
+
+    def test_index_batches(self, netbox_api, pusher):
+        pusher.ip_lookup_batch_size = 2
+
+        pusher._index_ip_addresses(
+            "192.0.2.1/24", "192.0.2.2/24", "198.51.100.1/24"
+        )
+
+        assert [r[2]["address"] for r in netbox_api.requests] == [
+            ["192.0.2.1/24", "192.0.2.2/24"], ["198.51.100.1/24"]
+        ]
+        assert [
+            a.id for a in pusher.lookup_cache.get("ip", "198.51.100.1/24")
+        ] == [4]
+
+
+class TestPreloadVlans():
+
+    @pytest.fixture
+    def netbox_api(self):
+        return StubNetboxAPI({"ipam/vlans/": [
+            {"id": 100, "vid": 10, "site": {"id": 1, "url": "site"}},
+            {"id": 200, "vid": 20, "site": {"id": 1, "url": "site"}},
+            {"id": 300, "vid": 30, "site": None},
+            {"id": 400, "vid": 10, "site": {"id": 2, "url": "site"}},
+        ]})
+
+    @pytest.fixture
+    def pusher(self, netbox_api):
+        return get_device_props_pusher(
+            netbox_api, {"interfaces": {}}, preload_vlans=True
+        )
+
+    def test_vlans_from_tables(self, netbox_api, pusher):
+        vlans_ids = [pusher._get_vlan_id(vlan) for vlan in (10, 20, 30, 10)]
+
+        assert vlans_ids == [100, 200, 300, 100]
+        # one listing of the site vlans, one of the global vlans
+        assert [r[2]["site_id"] for r in netbox_api.requests] == [1, "null"]
+        assert not any("vid" in r[2] for r in netbox_api.requests)
+
+    def test_vlan_created_during_run(self, netbox_api, pusher):
+        assert pusher._get_vlan_id(10) == 100
+        netbox_api.objects_by_route["ipam/vlans/"].append(
+            {"id": 500, "vid": 50, "site": {"id": 1, "url": "site"}}
+        )
+
+        assert pusher._get_vlan_id(50) == 500
+        assert pusher._get_vlan_id(50) == 500
+        vid_requests = [r for r in netbox_api.requests if "vid" in r[2]]
+        assert len(vid_requests) == 1
+
+    def test_vlan_not_found(self, pusher):
+        assert pusher._get_vlan_id(60) == -1
+
+
+class TestReconcileCables():
+
+    @pytest.fixture()
+    def pusher(self):
+        pusher = NetboxInterconnectionsPusher(NetboxAPI(url="netbox.tld/api"))
+        pusher.requests = []
+        pusher._bulk_request = lambda app, model, method, objects: (
+            pusher.requests.append((method, objects))
+        )
+
+        return pusher
+
+    def mock_netbox(self, pusher, interfaces_by_device, cables):
+        cables_by_netif = {}
+        for cable in cables:
+            cables_by_netif[cable.termination_a_id] = cable
+            cables_by_netif[cable.termination_b_id] = cable
+
+        def get_interfaces_for_device(hostname):
+            try:
+                return get_indexed_interfaces(*interfaces_by_device[hostname])
+            except KeyError:
+                raise DeviceNotFoundError(hostname)
+
+        pusher._get_interfaces_for_device = get_interfaces_for_device
+        pusher._get_cables_by_netif = lambda devices_ids: cables_by_netif
+
+    def get_interfaces(self):
+        return {
+            "switch-1": [
+                InterfaceRecord(10 + i, "eth{}".format(i), device_id=1)
+                for i in range(3)
+            ], "switch-2": [
+                InterfaceRecord(20 + i, "eth{}".format(i), device_id=2)
+                for i in range(3)
+            ],
+        }
+
+    def test_links_deduplicated_and_unchanged_skipped(self, pusher):
+        interfaces = self.get_interfaces()
+        s1, s2 = interfaces["switch-1"], interfaces["switch-2"]
+        self.mock_netbox(pusher, interfaces, [
+            StubNetboxCable(1, s1[0], s2[0])
+        ])
+
+        result = {"done": 0, "errors_interco": 0}
+        pusher._reconcile_cables(
+            [(s1[0], s2[0]), (s2[0], s1[0]), (s1[1], s2[1]), (s2[1], s1[1])],
+            ["switch-1", "switch-2"], overwrite=False, result=result
+        )
+
+        assert result == {"done": 2, "errors_interco": 0}
+        assert pusher.stats["skipped"] == 1
+        assert pusher.requests == [("post", [{
+            "termination_a_type": "dcim.interface", "termination_a_id": 11,
+            "termination_b_type": "dcim.interface", "termination_b_id": 21,
+            "connection_status": True
+        }])]
+
+    def test_cables_reused_and_cleaned(self, pusher):
+        interfaces = self.get_interfaces()
+        s1, s2 = interfaces["switch-1"], interfaces["switch-2"]
+        self.mock_netbox(pusher, interfaces, [
+            StubNetboxCable(1, s1[0], s2[1]),
+            StubNetboxCable(2, s1[1], s2[0]),
+            StubNetboxCable(3, s1[2], s2[2]),
+        ])
+
+        result = {"done": 0, "errors_interco": 0}
+        pusher._reconcile_cables(
+            [(s1[0], s2[0])], ["switch-1"], overwrite=True, result=result
+        )
+
+        assert result == {"done": 1, "errors_interco": 0}
+        assert pusher.requests == [
+            ("delete", [{"id": 2}, {"id": 3}]),
+            ("patch", [{
+                "id": 1,
+                "termination_a_type": "dcim.interface",
+                "termination_a_id": 10,
+                "termination_b_type": "dcim.interface",
+                "termination_b_id": 20,
+            }]),
+        ]
+
+    def test_conflicting_links_independent_of_order(self, pusher):
+        interfaces = self.get_interfaces()
+        s1, s2 = interfaces["switch-1"], interfaces["switch-2"]
+        self.mock_netbox(pusher, interfaces, [])
+
+        for links in ([(s1[0], s2[1]), (s1[0], s2[0])],
+                      [(s1[0], s2[0]), (s1[0], s2[1])]):
+            pusher.requests = []
+            result = {"done": 0, "errors_interco": 0}
+            pusher._reconcile_cables(
+                links, ["switch-1"], overwrite=False, result=result
+            )
+
+            assert result == {"done": 1, "errors_interco": 1}
+            assert [
+                (c["termination_a_id"], c["termination_b_id"])
+                for c in pusher.requests[0][1]
+            ] == [(10, 20)]
+
+    def test_unresolved_neighbour_cable_kept(self, pusher):
+        interfaces = self.get_interfaces()
+        s1, s2 = interfaces["switch-1"], interfaces["switch-2"]
+        self.mock_netbox(pusher, interfaces, [
+            StubNetboxCable(1, s1[1], s2[1]),
+            StubNetboxCable(2, s1[2], s2[2]),
+        ])
+
+        result = pusher.push(
+            {"switch-1": None}, overwrite=True, two_phase=True,
+            neighbours={"switch-1": [
+                {"local_port": "eth0", "hostname": "switch-2", "port": "eth0"},
+                {"local_port": "eth1", "hostname": "typo", "port": "eth1"},
+            ]}
+        )
+
+        assert result == {"done": 1, "errors_interco": 1, "errors_device": 0}
+        assert pusher.requests[0] == ("delete", [{"id": 2}])
+
+    def test_device_missing_in_netbox(self, pusher):
+        interfaces = self.get_interfaces()
+        self.mock_netbox(pusher, interfaces, [])
+
+        result = pusher.push(
+            {"switch-1": None, "ghost": None}, two_phase=True, neighbours={
+                "switch-1": [{
+                    "local_port": "eth0", "hostname": "switch-2",
+                    "port": "eth0"
+                }],
+                "ghost": [{
+                    "local_port": "eth0", "hostname": "switch-1",
+                    "port": "eth1"
+                }],
+            }
+        )
+
+        assert result == {"done": 1, "errors_interco": 1, "errors_device": 1}
+        assert [
+            (c["termination_a_id"], c["termination_b_id"])
+            for c in pusher.requests[0][1]
+        ] == [(10, 20)]
+
+
+class TestLockNetifsAndPeers():
+
+    def test_peers_locked(self):
+        netbox_api = StubNetboxAPI({})
+        pusher = NetboxInterconnectionsPusher(netbox_api)
+        interfaces_mapper = pusher._mappers["interfaces"]
+        netbox_netifs = {
+            1: interfaces_mapper._build_new_mapper_from(
+                {"id": 1, "connected_endpoint": None}, "dcim/interfaces/1/"
+            ),
+            2: interfaces_mapper._build_new_mapper_from(
+                {"id": 2, "connected_endpoint": {
+                    "id": 3, "url": "dcim/interfaces/3/"
+                }}, "dcim/interfaces/2/"
+            ),
+        }
+        pusher._fetch_netif = lambda netif: netbox_netifs[netif.id]
+
+        acquired = []
+        acquire = pusher._netif_locks.acquire
+        pusher._netif_locks.acquire = lambda *keys: (
+            acquired.append(sorted(keys)) or acquire(*keys)
+        )
+
+        with pusher._lock_netifs_and_peers(
+                InterfaceRecord(1, "eth0"), InterfaceRecord(2, "eth0")
+        ) as netifs:
+            assert netifs == [netbox_netifs[1], netbox_netifs[2]]
+
+        assert acquired == [[1, 2], [1, 2, 3]]
+        # peers are not fetched to be locked
+        assert netbox_api.requests == []
+
+
+class StubNetboxInterfacesAPI():
+    """
+    Stub of the netbox interfaces listing, filtered by device names
+    """
+
+    def __init__(self, interfaces_by_device):
+        self.interfaces = [
+            {
+                "id": i, "name": if_name, "mac_address": None,
+                "device": {"id": device_id, "name": hostname},
+                "cable": {"id": 100 + i} if i % 2 else None,
+            }
+            for device_id, (hostname, if_names) in enumerate(
+                sorted(interfaces_by_device.items())
+            )
+            for i, if_name in enumerate(if_names)
+        ]
+        self.requested_devices = []
+
+    def build_model_route(self, app_name, model):
+        return "{}/{}/".format(app_name, model)
+
+    def get(self, route, params=None):
+        self.requested_devices.append(params["device"])
+        results = [
+            netif for netif in self.interfaces
+            if netif["device"]["name"] in params["device"]
+        ]
+        return {"count": len(results), "next": None, "results": results}
+
+
+class TestInterfacesCache():
+
+    def test_bounded_by_interfaces(self):
+        cache = InterfacesCache(5)
+        cache["switch-1"] = {"eth0": InterfaceRecord(1, "eth0")}
+        cache["switch-2"] = {
+            "eth{}".format(i): InterfaceRecord(i, "eth{}".format(i))
+            for i in range(4)
+        }
+        assert cache.is_full()
+
+        cache["switch-3"] = {}
+        assert "switch-1" not in cache
+        assert "switch-2" in cache
+        assert cache["switch-3"] == {}
+
+    def test_too_many_interfaces_not_cached(self):
+        cache = InterfacesCache(1)
+        cache["switch-1"] = {
+            "eth0": InterfaceRecord(1, "eth0"),
+            "eth1": InterfaceRecord(2, "eth1"),
+        }
+
+        assert cache.get("switch-1") is None
+
+    def test_compact_records(self):
+        netif = StubNetboxInterface("eth0", "AA:BB:CC:DD:EE:FF")
+        netif.id = 1
+        netif._device_id = 2
+        netif._cable_id = 3
+
+        cache = InterfacesCache(10)
+        cache["switch-1"] = {"eth0": netif}
+
+        record = cache["switch-1"]["eth0"]
+        assert isinstance(record, InterfaceRecord)
+        assert (record.id, record.name, record.mac_address) == (
+            1, "eth0", "AA:BB:CC:DD:EE:FF"
+        )
+        assert (record.device_id, record.cable_id) == (2, 3)
+        assert cache["switch-1"].get_by_mac("aabb.ccdd.eeff") == [record]
+
+
+class TestPrewarmInterfacesCache():
+
+    def test_prewarm(self):
+        netbox_api = StubNetboxInterfacesAPI({
+            "switch-1": ["eth0", "eth1"], "switch-2": ["eth0"],
+            "switch-3": ["eth0"],
+        })
+        pusher = NetboxInterconnectionsPusher(netbox_api)
+        pusher.interfaces_prewarm_batch_size = 2
+        pusher.interfaces_cache["switch-3"] = {}
+
+        assert pusher.prewarm_interfaces_cache(
+            ["switch-3", "switch-2", "switch-1", "unknown"]
+        ) == 2
+        assert netbox_api.requested_devices == [
+            ["switch-1", "switch-2"], ["unknown"]
+        ]
+
+        interfaces = pusher.interfaces_cache["switch-1"]
+        assert sorted(interfaces) == ["eth0", "eth1"]
+        assert interfaces["eth1"].cable_id == 101
+        assert pusher.interfaces_cache["switch-3"] == {}
+        assert "unknown" not in pusher.interfaces_cache
+
+    def test_prewarm_stops_when_full(self):
+        netbox_api = StubNetboxInterfacesAPI({
+            "switch-1": ["eth0", "eth1"], "switch-2": ["eth0"],
+        })
+        pusher = NetboxInterconnectionsPusher(
+            netbox_api, interfaces_cache_size=2
+        )
+        pusher.interfaces_prewarm_batch_size = 1
+
+        assert pusher.prewarm_interfaces_cache(["switch-1", "switch-2"]) == 1
+        assert netbox_api.requested_devices == [["switch-1"]]
+
+
+class TestLinksRegistry():
+
+    def test_claim_unordered(self):
+        links = LinksRegistry()
+
+        assert links.claim(("switch-1", "eth0"), ("switch-2", "eth1"))
+        assert not links.claim(("switch-2", "eth1"), ("switch-1", "eth0"))
+        assert links.claim(("switch-1", "eth0"), ("switch-2", "eth2"))
+        assert len(links) == 2
+
+    def test_added_links_not_claimable(self):
+        links = LinksRegistry()
+        links.add(("switch-1", "Ethernet1/1"), ("switch-2", "xe-0/0/1"))
+
+        assert not links.claim(
+            ("switch-2", "xe-0/0/1"), ("switch-1", "Ethernet1/1")
+        )
+
+    def test_is_discovered(self):
+        links = LinksRegistry()
+        links.claim(("switch-1", "eth0"), ("switch-2", "eth1"))
+
+        assert links.is_discovered("switch-1", "eth0")
+        assert links.is_discovered("switch-2", "eth1")
+        assert not links.is_discovered("switch-1", "eth1")
+        assert not links.is_discovered("switch-3", "eth0")
+
+    def test_claimed_once_between_threads(self):
+        links = LinksRegistry()
+        endpoints = [
+            (("switch-{}".format(i % 10), "eth{}".format(i)),
+             ("switch-{}".format(i % 7), "eth{}".format(i + 1)))
+            for i in range(1000)
+        ]
+
+        def claim_all(reverse):
+            return sum(
+                links.claim(*((b, a) if reverse else (a, b)))
+                for a, b in endpoints
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            claimed = sum(executor.map(claim_all, [False, True] * 8))
+
+        assert claimed == len(links) == 1000
@@ -0,0 +1,74 @@
+from netbox_netprod_importer.results import get_props_hashes, PollResultsStore
+
+
+def get_props():
+    return {
+        "serial": "ABC123",
+        "interfaces": {
+            "Ethernet1/1": {"enabled": True, "ip": ["192.0.2.1/24"]},
+            "Ethernet1/2": {"enabled": False},
+        },
+    }
+
+
+class TestGetPropsHashes():
+
+    def test_neighbours_ignored(self):
+        props = get_props()
+        hashes = get_props_hashes(props)
+
+        props["neighbours"] = [{"local_port": "Ethernet1/1"}]
+        assert get_props_hashes(props) == hashes
+
+    def test_only_changed_interface_hash(self):
+        device_hash, interfaces_hashes = get_props_hashes(get_props())
+
+        props = get_props()
+        props["interfaces"]["Ethernet1/2"]["enabled"] = True
+        new_device_hash, new_interfaces_hashes = get_props_hashes(props)
+
+        assert new_device_hash != device_hash
+        assert (
+            new_interfaces_hashes["Ethernet1/1"] ==
+            interfaces_hashes["Ethernet1/1"]
+        )
+        assert (
+            new_interfaces_hashes["Ethernet1/2"] !=
+            interfaces_hashes["Ethernet1/2"]
+        )
+
+    def test_options_change_hashes(self):
+        assert (
+            get_props_hashes(get_props(), overwrite=True) !=
+            get_props_hashes(get_props(), overwrite=False)
+        )
+
+
+class TestPollResultsStore():
+
+    def test_never_pushed(self):
+        store = PollResultsStore(":memory:")
+
+        assert store.get_hashes("switch-1") == (None, {})
+
+    def test_save(self, tmp_path):
+        path = str(tmp_path / "cache" / "poll_results.sqlite")
+        props = get_props()
+        hashes = get_props_hashes(props)
+        store = PollResultsStore(path)
+        store.save("switch-1", *hashes)
+        store.close()
+
+        store = PollResultsStore(path)
+        assert store.get_hashes("switch-1") == hashes
+
+    def test_save_replaces_interfaces(self):
+        store = PollResultsStore(":memory:")
+        props = get_props()
+        store.save("switch-1", *get_props_hashes(props))
+
+        props["interfaces"].pop("Ethernet1/2")
+        hashes = get_props_hashes(props)
+        store.save("switch-1", *hashes)
+
+        assert store.get_hashes("switch-1") == hashes
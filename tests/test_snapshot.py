@@ -0,0 +1,51 @@
+import pytest
+
+from netbox_netprod_importer.snapshot import iter_snapshots, save_snapshot
+
+
+class StubImporter():
+    hostname = "192.0.2.3"
+    napalm_driver_name = "junos"
+
+
+class TestSnapshot():
+
+    def test_save_and_replay(self, tmp_path):
+        neighbours = [
+            {"local_port": "xe-0/0/1", "hostname": "sw2", "port": "Eth1/1"}
+        ]
+        props = {
+            "serial": "ABC123",
+            "interfaces": {"xe-0/0/1": {"enabled": True}},
+            "neighbours": neighbours,
+        }
+        save_snapshot(str(tmp_path), "sw1/a", StubImporter(), props)
+
+        (hostname, importer), = iter_snapshots(str(tmp_path))
+        assert hostname == "sw1/a"
+        with importer:
+            assert importer.poll() == {
+                "serial": "ABC123",
+                "interfaces": {"xe-0/0/1": {"enabled": True}},
+            }
+            assert list(importer.get_neighbours()) == neighbours
+
+        assert importer.hostname == "192.0.2.3"
+        assert importer.napalm_driver_name == "junos"
+
+    def test_neighbours_not_fetched(self, tmp_path):
+        save_snapshot(
+            str(tmp_path), "sw1", StubImporter(),
+            {"interfaces": {}, "neighbours": None}
+        )
+
+        (hostname, importer), = iter_snapshots(str(tmp_path))
+        with importer:
+            with pytest.raises(ValueError):
+                importer.get_neighbours()
+
+    def test_other_files_ignored(self, tmp_path):
+        (tmp_path / "README").write_text("")
+        save_snapshot(str(tmp_path), "sw1", StubImporter(), {})
+
+        assert [h for h, _ in iter_snapshots(str(tmp_path))] == ["sw1"]
@@ -1,5 +1,8 @@
+import threading
+import time
+
 from netbox_netprod_importer.tools import (
-    is_macaddr, macaddr_to_int
+    get_netbox_obj_changes, is_macaddr, KeyedLocks, macaddr_to_int
 )
 
 class TestTools():
@@ -21,3 +24,98 @@ class TestTools():
 
     def test_is_macaddr_false2(self):
         assert is_macaddr('00:11:22:AA:44:Gg') == False
+
+
+class StubNetboxObj():
+
+    def __init__(self, **props):
+        self.props = props
+
+    def to_dict(self):
+        return self.props
+
+
+class TestGetNetboxObjChanges():
+
+    def test_unchanged(self):
+        netbox_obj = StubNetboxObj(
+            type={"value": 1100, "label": "SFP+ (10GE)"},
+            mac_address="AA:BB:CC:DD:EE:FF", mtu=1500, description="",
+            untagged_vlan={"id": 3, "url": "http://netbox/ipam/vlans/3/"},
+            tagged_vlans=[{"id": 5, "vid": 20}, {"id": 4, "vid": 10}],
+        )
+        wanted_props = {
+            "type": 1100, "mac_address": "aabb.ccdd.eeff", "mtu": "1500",
+            "description": None, "untagged_vlan": 3, "tagged_vlans": [4, 5]
+        }
+
+        assert get_netbox_obj_changes(netbox_obj, wanted_props) == {}
+
+    def test_changed(self):
+        netbox_obj = StubNetboxObj(
+            mode={"value": 100, "label": "Access"}, mtu=None, enabled=True,
+            tagged_vlans=[{"id": 4, "vid": 10}],
+        )
+        wanted_props = {
+            "mode": 200, "mtu": 9000, "enabled": True, "tagged_vlans": [4, 5]
+        }
+
+        assert get_netbox_obj_changes(netbox_obj, wanted_props) == {
+            "mode": 200, "mtu": 9000, "tagged_vlans": [4, 5]
+        }
+
+    def test_missing_field(self):
+        netbox_obj = StubNetboxObj(serial="")
+
+        assert get_netbox_obj_changes(netbox_obj, {"serial": "ABC"}) == {
+            "serial": "ABC"
+        }
+
+
+class TestKeyedLocks():
+
+    def test_unrelated_keys_in_parallel(self):
+        locks = KeyedLocks()
+        barrier = threading.Barrier(2, timeout=5)
+
+        def hold(*keys):
+            with locks.acquire(*keys):
+                # both threads have to be in their critical section at the
+                # same time to pass the barrier
+                barrier.wait()
+
+        threads = [
+            threading.Thread(target=hold, args=keys)
+            for keys in ((1, 2), (3, 4))
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not barrier.broken
+        assert locks._locks == {}
+
+    def test_same_keys_serialized(self):
+        locks = KeyedLocks()
+        inside = []
+        max_inside = []
+
+        def hold(*keys):
+            with locks.acquire(*keys):
+                inside.append(1)
+                max_inside.append(len(inside))
+                time.sleep(0.01)
+                inside.pop()
+
+        threads = [
+            threading.Thread(target=hold, args=keys)
+            for keys in ((1, 2), (2, 1), (2, 3), (1, 2))
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert max(max_inside) == 1
+        assert locks._locks == {}
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
+import time
+
+from netboxapi import NetboxAPI
+
+from netbox_netprod_importer.push import (
+    InterfaceRecord, NetboxInterconnectionsPusher
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the interconnections throughput with per interface "
+            "locks and with a global lock, on a stubbed Netbox"
+        )
+    )
+    parser.add_argument(
+        "--links",
+        help="number of links to interconnect",
+        dest="links", default=400, type=int
+    )
+    parser.add_argument(
+        "--latency",
+        help="time to write a link in netbox, in ms",
+        dest="latency", default=12, type=float
+    )
+    parser.add_argument(
+        "--threads",
+        help="numbers of threads to compare",
+        dest="threads", default=[1, 4, 16], type=int, nargs="+"
+    )
+
+    return parser.parse_args()
+
+
+class StubNetboxInterface():
+
+    def __init__(self, id):
+        self.id = id
+        self.connected_endpoint = None
+
+
+def get_stub_pusher(latency):
+    """
+    :param latency: seconds taken to write a link
+    """
+    pusher = NetboxInterconnectionsPusher(NetboxAPI(url="netbox.tld/api"))
+    pusher._get_netif_or_derivative = lambda hostname, port: InterfaceRecord(
+        int(port), port
+    )
+    pusher._fetch_netif = lambda netif: StubNetboxInterface(netif.id)
+    pusher.interconnect_netbox_netif = lambda netif_a, netif_b: time.sleep(
+        latency
+    )
+
+    return pusher
+
+
+def use_global_lock(pusher):
+    global_lock = threading.Lock()
+    lock_netifs_and_peers = pusher._lock_netifs_and_peers
+
+    @contextmanager
+    def locked(*netifs):
+        with global_lock, lock_netifs_and_peers(*netifs) as netifs:
+            yield netifs
+
+    pusher._lock_netifs_and_peers = locked
+
+
+def bench(pusher, nb_links, threads):
+    """
+    :return links_per_sec:
+    """
+    intercos = [
+        {"local_port": str(2 * i), "hostname": "switch-2",
+         "port": str(2 * i + 1)}
+        for i in range(nb_links)
+    ]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(
+            lambda interco: pusher._interconnect_using_lldp_names(
+                "switch-1", None, interco
+            ), intercos
+        ))
+
+    return nb_links / (time.perf_counter() - start)
+
+
+def main():
+    args = parse_args()
+    latency = args.latency / 1000
+
+    for threads in args.threads:
+        global_lock_pusher = get_stub_pusher(latency)
+        use_global_lock(global_lock_pusher)
+        global_lock = bench(global_lock_pusher, args.links, threads)
+        per_netif = bench(get_stub_pusher(latency), args.links, threads)
+
+        print(
+            "{:>3} thread(s): global lock {:>7.1f} links/s, per interface "
+            "locks {:>7.1f} links/s  x{:.1f}".format(
+                threads, global_lock, per_netif, per_netif / global_lock
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import argparse
+import random
+import re
+import timeit
+
+from netbox_netprod_importer.vendors.classifier import InterfaceTypeClassifier
+from netbox_netprod_importer.vendors.cisco.constants import InterfacesRegex
+from netbox_netprod_importer.vendors.constants import NetboxInterfaceTypes
+
+
+#: part numbers and types reported by NX-OS and IOS devices
+CORPUS = (
+    "SFP-10G-SR", "SFP-10G-SR-S", "SFP-10G-LR", "SFP-10G-LR-S", "SFP-10G-ER",
+    "SFP-H10GB-CU1M", "SFP-H10GB-CU3M", "SFP-H10GB-ACU7M", "CWDM-SFP10G-1470",
+    "DWDM-SFP10G-30.33", "SFP-25G-SR-S", "SFP-25G-LR-S", "SFP-H25G-CU2M",
+    "QSFP-40G-SR4", "QSFP-40G-SR-BD", "QSFP-40G-LR4", "QSFP-4X10G-LR-S",
+    "QSFP-H40G-CU3M", "QSFP-100G-SR4-S", "QSFP-100G-LR4-S", "QSFP-40/100-SRBD",
+    "QSFP-4SFP25G-CU3M", "CFP-100G-LR4", "CFP-100G-SR10", "CFP2-100G-ER4",
+    "XENPAK-10GB-LR", "X2-10GB-SR", "GLC-T", "GLC-SX-MMD", "GLC-LH-SMD",
+    "1000BASE-SX", "1000BASE-LX/LH", "1000BaseLX", "10/100/1000BaseTX",
+    "10/100BaseTX", "10Gbase-SR", "10Gbase-LR", "10Gbase-CU3M", "10G",
+    "Fabric Exte",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the interface type classifier with matching each "
+            "pattern one by one"
+        )
+    )
+    parser.add_argument(
+        "--interfaces",
+        help="number of interfaces to classify",
+        dest="interfaces", default=100000, type=int
+    )
+    parser.add_argument(
+        "--repeat",
+        help="number of runs, the best one being kept",
+        dest="repeat", default=5, type=int
+    )
+
+    return parser.parse_args()
+
+
+def legacy_classify(type_str):
+    for pattern_iftype in InterfacesRegex:
+        if re.match(pattern_iftype.value, type_str):
+            return getattr(NetboxInterfaceTypes, pattern_iftype.name).value
+
+    return None
+
+
+def main():
+    args = parse_args()
+    rand = random.Random(0)
+    types = [rand.choice(CORPUS) for _ in range(args.interfaces)]
+
+    def bench(classify):
+        return min(timeit.repeat(
+            lambda: [classify(t) for t in types], number=1,
+            repeat=args.repeat
+        ))
+
+    classifier = InterfaceTypeClassifier(InterfacesRegex)
+    results = (
+        ("re.match per pattern", bench(legacy_classify)),
+        ("single alternation", bench(classifier._classify)),
+        ("single alternation, memoized", bench(classifier.classify)),
+    )
+    reference = results[0][1]
+    for name, duration in results:
+        print("{:<30} {:>8.1f}ms  x{:.1f}".format(
+            name, duration * 1000, reference / duration
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import re
+import time
+import tracemalloc
+
+from netbox_netprod_importer.vendors.cisco.decoders import (
+    get_json_decoder, json_decoders
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the decoders of NX-OS structured outputs, on a generated "
+            "show interface transceiver output"
+        )
+    )
+    parser.add_argument(
+        "--interfaces",
+        help="number of interfaces in the output",
+        dest="interfaces", default=2304, type=int
+    )
+    parser.add_argument(
+        "--repeat",
+        help="number of runs, the best one being kept",
+        dest="repeat", default=5, type=int
+    )
+
+    return parser.parse_args()
+
+
+def gen_transceiver_output(nb_interfaces):
+    """
+    Generate a show interface transceiver details output, with DOM lanes
+    """
+    rows = []
+    for i in range(nb_interfaces):
+        row = {
+            "interface": "Ethernet{}/{}".format(i // 36 + 1, i % 36 + 1),
+            "sfp": "present", "type": "QSFP-100G-SR4",
+            "name": "CISCO-FINISAR", "partnum": "FTLC9551REPM-C1",
+            "rev": "A0", "serialnum": "FNS2{:07d}".format(i),
+            "nom_bitrate": "25500", "len_50_OM3": "70", "len_50_OM4": "100",
+            "ciscoid": "17", "ciscoid_1": "220",
+            "cisco_part_number": "10-3142-03", "cisco_product_id":
+            "QSFP-100G-SR4-S", "cisco_vendor_id": "V03",
+            "TABLE_lane": {"ROW_lane": [
+                {
+                    "lane_number": str(lane), "temperature": "31.89",
+                    "temp_alrm_hi": "75.00", "temp_alrm_lo": "-5.00",
+                    "temp_warn_hi": "70.00", "temp_warn_lo": "0.00",
+                    "voltage": "3.28", "volt_alrm_hi": "3.63",
+                    "volt_alrm_lo": "2.97", "volt_warn_hi": "3.46",
+                    "volt_warn_lo": "3.13", "current": "6.50",
+                    "current_alrm_hi": "10.00", "current_alrm_lo": "5.00",
+                    "tx_pwr": "-0.43", "tx_pwr_alrm_hi": "5.39",
+                    "tx_pwr_alrm_lo": "-12.44", "rx_pwr": "-0.82",
+                    "rx_pwr_alrm_hi": "5.39", "rx_pwr_alrm_lo": "-14.40",
+                }
+                for lane in range(1, 5)
+            ]},
+        }
+        rows.append(row)
+
+    return json.dumps(
+        {"TABLE_interface": {"ROW_interface": rows}}, indent=2
+    )
+
+
+def legacy_get_rows(output):
+    if not re.search("^{", output):
+        output = re.sub(r"^.+\. {", "{", output, count=1)
+
+    return json.loads(output)["TABLE_interface"]["ROW_interface"]
+
+
+def bench(get_rows, output, repeat):
+    """
+    :return (best duration, peak memory): in seconds and bytes
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        get_rows(output)
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    get_rows(output)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(durations), peak
+
+
+def main():
+    args = parse_args()
+    output = gen_transceiver_output(args.interfaces)
+    print("Output of {} interfaces: {:.1f}MB".format(
+        args.interfaces, len(output) / 1024 ** 2
+    ))
+
+    results = [("json.loads, whole document", legacy_get_rows)]
+    for name in json_decoders:
+        decoder = get_json_decoder(name)
+        results.append((
+            "{}, interface and partnum".format(name),
+            lambda output, decoder=decoder: decoder.get_rows(
+                output, "TABLE_interface", "ROW_interface",
+                fields=("interface", "partnum")
+            )
+        ))
+
+    reference = None
+    for name, get_rows in results:
+        duration, peak = bench(get_rows, output, args.repeat)
+        reference = reference or duration
+        print("{:<32} {:>8.1f}ms  x{:<5.1f} peak {:>6.1f}MB".format(
+            name, duration * 1000, reference / duration, peak / 1024 ** 2
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,8 @@ import socket
 import sys
 import argparse
 from boltons.cacheutils import LRU
-from netboxapi import NetboxAPI, NetboxMapper
-from netbox_netprod_importer.config import get_config
+from netboxapi import NetboxMapper
+from netbox_netprod_importer.api import get_netbox_api
 import requests
 import yaml
 
@@ -53,7 +53,7 @@ def parse_args():
 
 
 def push_devices(parsed_args):
-    netbox_api = NetboxAPI(**get_config()["netbox"])
+    netbox_api = get_netbox_api()
     manufacturers = create_manufacturers(netbox_api)
 
     if parsed_args.types: